@@ -13,6 +13,7 @@ from discord import app_commands
 from discord.ext import commands
 
 from config import config
+from utils.tree import record_command
 
 if TYPE_CHECKING:
     from main import OneBot
@@ -60,6 +61,7 @@ class Errors(commands.Cog):
 
     # actual app command error handling method
     async def tree_on_error(self, i: discord.Interaction, error: Exception) -> None:
+        record_command(i, "error")
         if "handled" in getattr(error, "__notes__", []):
             return
         if await self.handle(i, error):
@@ -72,7 +74,7 @@ class Errors(commands.Cog):
                     str(error.original)
                     or "Something went wrong. Please try again later.",
                 )
-            elif isinstance(error.original, aiohttp.ConnectionTimeoutError):
+            elif isinstance(error.original, aiohttp.ServerTimeoutError):
                 await self.send_error(
                     i, "Connection timed out. Please try again later."
                 )
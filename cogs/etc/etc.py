@@ -1,14 +1,40 @@
 from __future__ import annotations
 
+import asyncio
+import cProfile
 import importlib
 import logging
+import marshal
 import subprocess
-from typing import TYPE_CHECKING
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from io import BytesIO
+from typing import TYPE_CHECKING, Literal
 
 import discord
 from discord.ext import commands, tasks
 
 from config import config
+from utils import metrics
+from utils.db import (
+    ACQUIRE_SECONDS,
+    POOL_CONNECTIONS,
+    QUERIES_IN_FLIGHT,
+    QUERY_ERRORS,
+    QUERY_SECONDS,
+)
+from utils.lag import BLOCKS
+from utils.profiler import SamplingProfiler
+from utils.tree import (
+    COMMAND_DB_SECONDS,
+    COMMAND_HTTP_SECONDS,
+    COMMAND_SECONDS,
+    COMMANDS,
+    FIRST_RESPONSE_SECONDS,
+)
+from utils.views import live_views
 
 if TYPE_CHECKING:
     from main import OneBot
@@ -19,13 +45,17 @@ class Etc(commands.Cog):
 
     def __init__(self, bot: OneBot):
         self.bot = bot
+        self.profiling = False
+        self.memory_snapshot: tracemalloc.Snapshot | None = None
+        self.bot.cluster.register("reload", self.reload_extensions)
         self.post_stats.start()
 
     @tasks.loop(hours=6)
     async def post_stats(self):
         """Post guild count to top.gg automatically."""
 
-        if config.get("topgg_token") is None:
+        # the first cluster posts the count for all of them
+        if config.get("topgg_token") is None or self.bot.cluster.id != 0:
             return
 
         await self.bot.wait_until_ready()
@@ -33,7 +63,7 @@ class Etc(commands.Cog):
             async with self.bot.session.post(
                 f"https://top.gg/api/bots/{self.bot.user.id}/stats",
                 headers={"Authorization": config["topgg_token"]},
-                json={"server_count": len(self.bot.guilds)},
+                json={"server_count": await self.bot.total_guild_count()},
             ) as r:
                 if r.status != 200:
                     logging.error(
@@ -57,6 +87,21 @@ class Etc(commands.Cog):
     @commands.command(aliases=["re"])
     @commands.is_owner()
     async def reload(self, ctx: commands.Context, *, cogs: str | None = None):
+        results = await self.bot.cluster.request("reload", cogs, timeout=60)
+        if self.bot.cluster.count == 1:
+            await ctx.reply(results.get(0, "❌ Reload failed."))
+            return
+
+        await ctx.reply(
+            "\n".join(
+                f"**Cluster {cluster_id}**: {results.get(cluster_id, '❌ No response.')}"
+                for cluster_id in range(self.bot.cluster.count)
+            )
+        )
+
+    async def reload_extensions(self, cogs: str | None) -> str:
+        """Reload cogs in this cluster. Runs on every cluster when the reload command is used."""
+
         try:
             if not cogs:
                 cogs_to_reload = [
@@ -67,12 +112,11 @@ class Etc(commands.Cog):
 
             for cog in cogs_to_reload:
                 await self.bot.reload_extension(cog)
-            await ctx.reply(
-                "✅ Reloaded cogs:\n"
-                + "\n".join([f"`{cog}`" for cog in cogs_to_reload])
+            return "✅ Reloaded cogs:\n" + "\n".join(
+                [f"`{cog}`" for cog in cogs_to_reload]
             )
         except commands.ExtensionError as e:
-            await ctx.reply(f"❌ {e}")
+            return f"❌ {e}"
 
     @commands.command(aliases=["ri"])
     @commands.is_owner()
@@ -117,3 +161,229 @@ class Etc(commands.Cog):
     async def activity(self, ctx: commands.Context, *, status: str | None = None):
         await self.bot.change_presence(activity=discord.CustomActivity(status))
         await ctx.reply(f"✅ Activity set to `{status}`.")
+
+    @commands.command()
+    @commands.is_owner()
+    async def metrics(self, ctx: commands.Context, prefix: str = ""):
+        text = metrics.render(prefix)
+        if not text:
+            await ctx.reply(f"❌ No metrics starting with `{prefix}`.")
+        elif len(text) > 1990:
+            await ctx.reply(file=discord.File(BytesIO(text.encode()), "metrics.txt"))
+        else:
+            await ctx.reply(f"```\n{text}```")
+
+    @commands.command(aliases=["q"])
+    @commands.is_owner()
+    async def queries(self, ctx: commands.Context):
+        # statements sorted by total time spent on them
+        rows = []
+        for (statement,) in QUERY_SECONDS.label_values():
+            count = QUERY_SECONDS.count(statement=statement)
+            total = QUERY_SECONDS.sum(statement=statement)
+            p95 = QUERY_SECONDS.quantile(0.95, statement=statement)
+            errors = QUERY_ERRORS.get(statement=statement)
+            rows.append((total, statement, count, errors, p95))
+        if not rows:
+            await ctx.reply("❌ No queries have been run yet.")
+            return
+
+        rows.sort(reverse=True)
+        text = f"{'statement':<40} {'calls':>7} {'errors':>6} {'total s':>8} {'avg ms':>7} {'p95 ms':>7}\n"
+        for total, statement, count, errors, p95 in rows:
+            text += (
+                f"{statement:<40} {count:>7} {errors:>6.0f} {total:>8.2f} "
+                f"{total / count * 1000:>7.1f} {p95 * 1000:>7.1f}\n"
+            )
+
+        if len(text) > 1990:
+            await ctx.reply(file=discord.File(BytesIO(text.encode()), "queries.txt"))
+        else:
+            await ctx.reply(f"```\n{text}```")
+
+    @commands.command()
+    @commands.is_owner()
+    async def pool(self, ctx: commands.Context):
+        if not hasattr(self.bot, "pool"):
+            await ctx.reply("❌ No database is configured.")
+            return
+
+        connections = {
+            state: value for _, (state,), value in POOL_CONNECTIONS.samples()
+        }
+        in_flight = sum(value for _, _, value in QUERIES_IN_FLIGHT.samples())
+        p50 = ACQUIRE_SECONDS.quantile(0.5) or 0
+        p99 = ACQUIRE_SECONDS.quantile(0.99) or 0
+        await ctx.reply(
+            f"Connections: {connections['acquired']:.0f} acquired, "
+            f"{connections['idle']:.0f} idle, {connections['max']:.0f} max\n"
+            f"Queries in flight: {in_flight:.0f}\n"
+            f"Acquires: {ACQUIRE_SECONDS.count()}, "
+            f"wait p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms"
+        )
+
+    @commands.command()
+    @commands.is_owner()
+    async def lag(self, ctx: commands.Context):
+        monitor = self.bot.lag_monitor
+        percentiles = monitor.percentiles()
+        if not percentiles:
+            await ctx.reply("❌ Not enough samples yet.")
+            return
+
+        text = (
+            f"Event loop lag over the last {len(monitor.samples) * monitor.interval:.0f} s: "
+            + ", ".join(f"{k} {v * 1000:.1f} ms" for k, v in percentiles.items())
+            + f"\nBlocked over {monitor.threshold * 1000:.0f} ms: {BLOCKS.get():.0f} times"
+        )
+        # the watchdog thread appends to the deque, so iterate over a copy
+        for block in reversed(list(monitor.blocks)):
+            ago = time.monotonic() - block.started_at
+            text += (
+                f"\n- {block.seconds * 1000:.0f} ms, {ago:.0f} s ago: `{block.name}`"
+            )
+
+        await ctx.reply(text[:2000])
+
+    @commands.command(aliases=["cs"])
+    @commands.is_owner()
+    async def commandstats(self, ctx: commands.Context):
+        # commands sorted by p99 time to first response, closest to the 3 second deadline first
+        rows = []
+        for (command,) in COMMAND_SECONDS.label_values():
+            first = [
+                FIRST_RESPONSE_SECONDS.quantile(q, command=command) or 0
+                for q in (0.5, 0.95, 0.99)
+            ]
+            total = [
+                COMMAND_SECONDS.quantile(q, command=command) for q in (0.5, 0.95, 0.99)
+            ]
+            http = COMMAND_HTTP_SECONDS.quantile(0.95, command=command)
+            db = COMMAND_DB_SECONDS.quantile(0.95, command=command)
+            calls = COMMAND_SECONDS.count(command=command)
+            errors = COMMANDS.get(command=command, status="error")
+            rows.append((first, command, calls, errors, total, http, db))
+        if not rows:
+            await ctx.reply("❌ No commands have been run yet.")
+            return
+
+        rows.sort(key=lambda row: row[0][2], reverse=True)
+        text = "All times in ms.\n" + (
+            f"{'command':<24} {'calls':>6} {'errors':>6} "
+            f"{'first response p50/p95/p99':>26} {'total p50/p95/p99':>26} "
+            f"{'http p95':>8} {'db p95':>8}\n"
+        )
+        for first, command, calls, errors, total, http, db in rows:
+            first_ms = "/".join(f"{q * 1000:.0f}" for q in first)
+            total_ms = "/".join(f"{q * 1000:.0f}" for q in total)
+            text += (
+                f"{command:<24} {calls:>6} {errors:>6.0f} {first_ms:>26} {total_ms:>26} "
+                f"{http * 1000:>8.0f} {db * 1000:>8.0f}\n"
+            )
+
+        if len(text) > 1990:
+            await ctx.reply(file=discord.File(BytesIO(text.encode()), "commands.txt"))
+        else:
+            await ctx.reply(f"```\n{text}```")
+
+    @commands.command()
+    @commands.is_owner()
+    async def profile(
+        self,
+        ctx: commands.Context,
+        seconds: commands.Range[int, 1, 300] = 30,
+        mode: Literal["sample", "cprofile"] = "sample",
+    ):
+        # sampling gives collapsed stacks for a flame graph with little overhead,
+        # cprofile gives a pstats file but slows every call down while it runs
+        if self.profiling:
+            await ctx.reply("❌ A profile is already running.")
+            return
+
+        self.profiling = True
+        await ctx.reply(f"⏳ Profiling for {seconds} seconds ({mode})...")
+        if mode == "sample":
+            profiler = SamplingProfiler(threading.get_ident())
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            # stop even if the command is cancelled, so the profiler doesn't keep running
+            if mode == "sample":
+                profiler.stop()
+            else:
+                profiler.disable()
+            self.profiling = False
+
+        if mode == "sample":
+            content = f"✅ {profiler.samples} samples."
+            file = discord.File(
+                BytesIO(profiler.collapsed().encode()), "profile.folded"
+            )
+        else:
+            profiler.create_stats()
+            content = "✅ Open with `python -m pstats profile.pstats`."
+            # the format written by pstats.Stats.dump_stats
+            file = discord.File(
+                BytesIO(marshal.dumps(profiler.stats)), "profile.pstats"
+            )
+
+        await ctx.reply(content, file=file)
+
+    @commands.command(aliases=["mem"])
+    @commands.is_owner()
+    async def memory(
+        self, ctx: commands.Context, action: Literal["stop"] | None = None
+    ):
+        if action == "stop":
+            tracemalloc.stop()
+            self.memory_snapshot = None
+            await ctx.reply("✅ Stopped tracing allocations.")
+            return
+
+        text = ""
+        # tracing slows allocations down, so it only runs once this command is used
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            text += "Started tracing allocations, use this again to see them.\n\n"
+        else:
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)]
+            )
+            current, peak = tracemalloc.get_traced_memory()
+            text += f"Traced: {current / 2**20:.1f} MiB (peak {peak / 2**20:.1f} MiB)\n"
+            text += "\nTop allocations:\n"
+            for stat in snapshot.statistics("lineno")[:10]:
+                text += f"{stat}\n"
+            if self.memory_snapshot:
+                text += "\nChanges since the last snapshot:\n"
+                for stat in snapshot.compare_to(self.memory_snapshot, "lineno")[:10]:
+                    text += f"{stat}\n"
+            self.memory_snapshot = snapshot
+
+        views = live_views(self.bot)
+        by_class = Counter(type(view).__qualname__ for view in views)
+        text += f"\nLive views: {len(views)}\n"
+        for name, count in by_class.most_common():
+            text += f"{name}: {count}\n"
+
+        text += (
+            "\nCaches:\n"
+            f"Guilds: {len(self.bot.guilds)}\n"
+            f"Users: {len(self.bot.users)}\n"
+            f"Members: {sum(len(guild.members) for guild in self.bot.guilds)}\n"
+            f"Messages: {len(self.bot.cached_messages)}\n"
+        )
+        if starboard := self.bot.get_cog("Starboard"):
+            text += (
+                f"Starboard configs: {len(starboard.configs)}, "
+                f"tally: {len(starboard.tally)}\n"
+            )
+
+        if len(text) > 1990:
+            await ctx.reply(file=discord.File(BytesIO(text.encode()), "memory.txt"))
+        else:
+            await ctx.reply(f"```\n{text}```")
@@ -7,10 +7,10 @@ from typing import TYPE_CHECKING, Literal
 from urllib.parse import quote_plus
 
 import discord
-from aiohttp import ClientSession
 from discord import app_commands
 from discord.ext import commands
 
+from utils.http import HTTPClient
 from utils.utils import Embed
 from utils.views import Confirm, DeleteButton
 
@@ -491,7 +491,7 @@ class Fun(commands.Cog):
 
     # get non-nsfw reddit post
     @staticmethod
-    async def get_reddit_post(session: ClientSession) -> dict:
+    async def get_reddit_post(session: HTTPClient) -> dict:
         nsfw = True
         while nsfw:
             async with session.get("https://meme-api.com/gimme") as r:
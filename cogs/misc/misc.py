@@ -30,6 +30,7 @@ class Miscellaneous(commands.Cog):
     @app_commands.command(name="botinfo", description="Get information about the bot")
     async def botinfo(self, i: discord.Interaction):
         appinfo = await self.bot.application_info()
+        guild_count = await self.bot.total_guild_count()
         user_installs = appinfo.approximate_user_install_count
         command_count = 0
         for command in self.bot.tree.get_commands():
@@ -39,7 +40,7 @@ class Miscellaneous(commands.Cog):
         embed = discord.Embed(
             title=f"{self.bot.user.name} Stats and Information",
             colour=self.bot.colour,
-            description=f"**Servers**: {len(self.bot.guilds)}\n"
+            description=f"**Servers**: {guild_count}\n"
             f"**User installs**: {user_installs}\n"
             f"**Websocket latency**: {(self.bot.latency * 1000):.0f} ms\n"
             f"**Command count**: {command_count}\n",
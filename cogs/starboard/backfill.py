@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import discord
+
+from utils.db import acquire
+
+from . import queries
+from .tally import count_stars
+
+if TYPE_CHECKING:
+    from main import OneBot
+
+
+class Backfill:
+    """Scan channel history for messages that already have enough stars and add them to starred_messages.
+
+    Each channel's progress is checkpointed in the starboard_backfill table after every batch,
+    so running the backfill again continues where it stopped.
+
+    :param bot: The bot, for its database pool.
+    :type bot: OneBot
+    :param guild: The guild to backfill.
+    :type guild: discord.Guild
+    :param channels: The channels to scan.
+    :type channels: list[discord.TextChannel]
+    :param threshold: The minimum number of stars.
+    :type threshold: int
+    :param after: Where to start scanning channels without a checkpoint.
+    :type after: datetime
+    :param restart: Whether to ignore existing checkpoints, defaults to False.
+    :type restart: bool
+    :param concurrency: The number of channels to scan at once, defaults to 3.
+    :type concurrency: int
+    :param batch_size: Messages to scan between checkpoints, defaults to 100.
+    :type batch_size: int"""
+
+    def __init__(
+        self,
+        bot: OneBot,
+        guild: discord.Guild,
+        channels: list[discord.TextChannel],
+        threshold: int,
+        after: datetime,
+        *,
+        restart: bool = False,
+        concurrency: int = 3,
+        batch_size: int = 100,
+    ):
+        self.bot = bot
+        self.guild = guild
+        self.channels = channels
+        self.threshold = threshold
+        self.after = after
+        self.restart = restart
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task: asyncio.Task | None = None
+
+        self.scanned = 0
+        self.found = 0
+        self.channels_done = 0
+
+    def progress(self) -> str:
+        return (
+            f"Scanned {self.scanned} messages in {self.channels_done}/{len(self.channels)} channels, "
+            f"found {self.found} with at least {self.threshold} stars."
+        )
+
+    async def run(self) -> None:
+        """Scan every channel. If one scan fails, the others are stopped."""
+
+        self._task = asyncio.current_task()
+        scans = [asyncio.create_task(self.scan(channel)) for channel in self.channels]
+        try:
+            await asyncio.gather(*scans)
+        finally:
+            for scan in scans:
+                scan.cancel()
+
+    def cancel(self) -> None:
+        """Stop a running backfill. Channels keep their last checkpoint."""
+
+        if self._task:
+            self._task.cancel()
+
+    async def scan(self, channel: discord.TextChannel) -> None:
+        async with self._semaphore:
+            checkpoint = await queries.GET_BACKFILL_CHECKPOINT.fetchrow(
+                self.bot.pool, self.guild.id, channel.id
+            )
+            if checkpoint and not self.restart:
+                if checkpoint["done"]:
+                    self.channels_done += 1
+                    return
+                after = discord.Object(id=checkpoint["last_message_id"])
+            else:
+                after = discord.Object(id=discord.utils.time_snowflake(self.after))
+
+            batch = []
+            scanned = 0
+            last_message_id = None
+            async for message in channel.history(
+                limit=None, after=after, oldest_first=True
+            ):
+                self.scanned += 1
+                scanned += 1
+                last_message_id = message.id
+
+                if self.qualifies(message):
+                    batch.append(message)
+                if scanned % self.batch_size == 0:
+                    await self.save(channel, batch, last_message_id, done=False)
+                    batch = []
+
+            await self.save(channel, batch, last_message_id or after.id, done=True)
+            self.channels_done += 1
+
+    def qualifies(self, message: discord.Message) -> bool:
+        for reaction in message.reactions:
+            if str(reaction.emoji) == "⭐":
+                # only check for the author's own star if it could make a difference
+                return reaction.count >= self.threshold
+        return False
+
+    async def save(
+        self,
+        channel: discord.TextChannel,
+        messages: list[discord.Message],
+        last_message_id: int,
+        *,
+        done: bool,
+    ) -> None:
+        """Insert a batch of starred messages and checkpoint the channel in one transaction."""
+
+        rows = []
+        for message in messages:
+            stars = await count_stars(message)
+            if stars >= self.threshold:
+                rows.append((message, stars))
+
+        async with acquire(self.bot.pool) as conn, conn.transaction():
+            if rows:
+                result = await queries.INSERT_BACKFILLED_MESSAGES.execute(
+                    conn,
+                    [m.id for m, _ in rows],
+                    [self.guild.id] * len(rows),
+                    [channel.id] * len(rows),
+                    [m.author.id for m, _ in rows],
+                    [m.jump_url for m, _ in rows],
+                    [stars for _, stars in rows],
+                )
+                self.found += int(result.split()[-1])
+
+            await queries.SET_BACKFILL_CHECKPOINT.execute(
+                conn,
+                self.guild.id,
+                channel.id,
+                last_message_id,
+                done,
+            )
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+
+class EditQueue:
+    """Per-channel queues of starboard post edits.
+
+    Only the newest pending edit of each post is kept. A channel's edits are made one at a time,
+    and each round of edits is followed by `interval` seconds of waiting, so a post is edited at
+    most once per interval no matter how many reactions its message gets.
+
+    :param interval: Minimum seconds between edits of the same post, defaults to 5.
+    :type interval: float"""
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        # channel_id: {message_id: edit}
+        self._pending: dict[int, dict[int, Callable[[], Awaitable[None]]]] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+
+    def submit(
+        self, channel_id: int, message_id: int, edit: Callable[[], Awaitable[None]]
+    ) -> None:
+        """Queue an edit of a message, replacing any pending edit of the same message."""
+
+        self._pending.setdefault(channel_id, {})[message_id] = edit
+        if channel_id not in self._workers:
+            self._workers[channel_id] = asyncio.create_task(self._work(channel_id))
+
+    def discard(self, channel_id: int, message_id: int) -> None:
+        """Drop the pending edit of a message that was deleted."""
+
+        self._pending.get(channel_id, {}).pop(message_id, None)
+
+    def cancel(self) -> None:
+        for worker in self._workers.values():
+            worker.cancel()
+        self._pending.clear()
+
+    async def _work(self, channel_id: int) -> None:
+        try:
+            while pending := self._pending.pop(channel_id, None):
+                for message_id, edit in pending.items():
+                    try:
+                        await edit()
+                    except Exception:
+                        logging.exception(f"Failed to edit starboard post {message_id}")
+                await asyncio.sleep(self.interval)
+        finally:
+            self._workers.pop(channel_id, None)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Literal
+
+import discord
+
+from . import queries
+
+if TYPE_CHECKING:
+    from main import OneBot
+
+QUERIES = {
+    "Users": (
+        queries.LEADERBOARD_USERS_COUNT,
+        queries.LEADERBOARD_USERS_FIRST,
+        queries.LEADERBOARD_USERS_NEXT,
+        queries.LEADERBOARD_USERS_LAST,
+    ),
+    "Messages": (
+        queries.LEADERBOARD_MESSAGES_COUNT,
+        queries.LEADERBOARD_MESSAGES_FIRST,
+        queries.LEADERBOARD_MESSAGES_NEXT,
+        queries.LEADERBOARD_MESSAGES_LAST,
+    ),
+}
+
+
+class Leaderboard:
+    """A guild's starboard leaderboard, fetched one page at a time.
+
+    :param bot: The bot, for its database pool and colour.
+    :type bot: OneBot
+    :param guild_id: The guild to rank users or messages in.
+    :type guild_id: int
+    :param rank_by: Whether to rank users by their total stars, or individual messages.
+    :type rank_by: Literal["Users", "Messages"]
+    :param per_page: Entries per page, defaults to 10.
+    :type per_page: int"""
+
+    def __init__(
+        self,
+        bot: OneBot,
+        guild_id: int,
+        rank_by: Literal["Users", "Messages"],
+        per_page: int = 10,
+    ):
+        self.bot = bot
+        self.guild_id = guild_id
+        self.rank_by = rank_by
+        self.per_page = per_page
+        # sort key of the last row before each page; None for the first page
+        self._cursors: list[tuple[int, int] | None] = [None]
+        self.total = 0
+
+    async def count(self) -> int:
+        """Get the number of entries on the leaderboard."""
+
+        count_query, _, _, _ = QUERIES[self.rank_by]
+        self.total = await count_query.fetchval(self.bot.pool, self.guild_id) or 0
+        return self.total
+
+    async def fetch_last(self) -> list:
+        """Fetch the last page by reading the leaderboard backwards, without walking to it."""
+
+        _, _, _, last_page = QUERIES[self.rank_by]
+        size = self.total - (self.total - 1) // self.per_page * self.per_page
+        rows = await last_page.fetch(self.bot.pool, self.guild_id, size)
+        return rows[::-1]
+
+    async def fetch(self, cursor: tuple[int, int] | None) -> list:
+        _, first_page, next_page, _ = QUERIES[self.rank_by]
+        if cursor is None:
+            return await first_page.fetch(self.bot.pool, self.guild_id, self.per_page)
+        return await next_page.fetch(
+            self.bot.pool, self.guild_id, self.per_page, *cursor
+        )
+
+    async def get_page(self, index: int) -> discord.Embed:
+        """Build the embed for a page, walking forward from the nearest known page if needed."""
+
+        page = min(index, len(self._cursors) - 1)
+        if page < index == (self.total - 1) // self.per_page:
+            # going back from the first page wraps around to the last, so don't walk to it
+            rows = await self.fetch_last()
+        else:
+            while True:
+                rows = await self.fetch(self._cursors[page])
+                if rows and len(self._cursors) == page + 1:
+                    last = rows[-1]
+                    self._cursors.append(
+                        (last["total_stars"], last["author_id"])
+                        if self.rank_by == "Users"
+                        else (last["star_count"], last["message_id"])
+                    )
+                if page == index or not rows:
+                    break
+                page += 1
+
+        lines = []
+        for rank, row in enumerate(rows, start=index * self.per_page + 1):
+            if self.rank_by == "Users":
+                lines.append(
+                    f"**{rank}.** <@{row['author_id']}> \N{EM DASH} ⭐ {row['total_stars']} "
+                    f"({row['total_starred']} messages)"
+                )
+            else:
+                url = f"https://discord.com/channels/{self.guild_id}/{row['channel_id']}/{row['message_id']}"
+                lines.append(
+                    f"**{rank}.** ⭐ {row['star_count']} \N{EM DASH} [Message]({url}) by <@{row['author_id']}>"
+                )
+
+        return discord.Embed(
+            title=f"Starboard Leaderboard ({self.rank_by})",
+            colour=self.bot.colour,
+            description="\n".join(lines) or "No entries.",
+        )
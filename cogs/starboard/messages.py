@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import discord
+
+from utils.metrics import Counter
+
+if TYPE_CHECKING:
+    from main import OneBot
+
+LOOKUPS = Counter(
+    "starboard_message_lookups_total",
+    "Starboard message lookups by where the message was found",
+    ("source",),
+)
+
+
+class MessageCache:
+    """Look up messages in discord.py's message cache, and only fetch them if it misses.
+
+    discord.py keeps the reactions of cached messages up to date, so a cached message can be
+    used to count stars just like a freshly fetched one. Messages fetched here aren't kept,
+    as their reactions would go stale.
+
+    :param bot: The bot, for its message cache.
+    :type bot: OneBot"""
+
+    def __init__(self, bot: OneBot):
+        self.bot = bot
+
+    async def get(
+        self, channel: discord.abc.Messageable, message_id: int
+    ) -> discord.Message:
+        """Get a message with current reactions, fetching it if it isn't cached.
+
+        :raises discord.NotFound: The message was deleted."""
+
+        message = discord.utils.get(reversed(self.bot.cached_messages), id=message_id)
+        if message:
+            LOOKUPS.inc(source="cache")
+            return message
+
+        LOOKUPS.inc(source="fetch")
+        return await channel.fetch_message(message_id)
@@ -0,0 +1,202 @@
+"""Every SQL statement used by the starboard, declared once."""
+
+from utils.db import Query
+
+# starboard configuration
+
+GET_CONFIGS = Query(
+    "starboard.get_configs",
+    """
+    SELECT guild_id, channel_id, star_count, use_webhook, webhook_id, webhook_token
+    FROM starboard
+    """,
+)
+# keep the stored webhook only if the channel hasn't changed
+SET_CONFIG = Query(
+    "starboard.set_config",
+    """
+    INSERT INTO starboard (guild_id, channel_id, star_count, use_webhook)
+    VALUES ($1, $2, $3, $4)
+    ON CONFLICT (guild_id)
+    DO UPDATE SET channel_id = $2, star_count = $3, use_webhook = $4,
+        webhook_id = CASE WHEN starboard.channel_id = $2 THEN starboard.webhook_id END,
+        webhook_token = CASE WHEN starboard.channel_id = $2 THEN starboard.webhook_token END
+    RETURNING channel_id, star_count, use_webhook, webhook_id, webhook_token
+    """,
+)
+DELETE_CONFIG = Query(
+    "starboard.delete_config", "DELETE FROM starboard WHERE guild_id = $1"
+)
+SET_WEBHOOK = Query(
+    "starboard.set_webhook",
+    "UPDATE starboard SET webhook_id = $2, webhook_token = $3 WHERE guild_id = $1",
+)
+
+# starred messages
+
+GET_STARRED_MESSAGE = Query(
+    "starboard.get_starred_message",
+    """
+    SELECT author_id, starboard_message_id, starboard_caption_id, star_count
+    FROM starred_messages WHERE message_id = $1
+    """,
+)
+INSERT_STARRED_MESSAGE = Query(
+    "starboard.insert_starred_message",
+    """
+    INSERT INTO starred_messages
+    (message_id, starboard_message_url, guild_id, channel_id, author_id, starboard_message_id, star_count, starboard_caption_id)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    """,
+)
+UPDATE_STAR_COUNTS = Query(
+    "starboard.update_star_counts",
+    """
+    UPDATE starred_messages AS s
+    SET star_count = b.star_count
+    FROM unnest($1::bigint[], $2::int[]) AS b(message_id, star_count)
+    WHERE s.message_id = b.message_id
+    """,
+)
+DELETE_STARRED_MESSAGE = Query(
+    "starboard.delete_starred_message",
+    "DELETE FROM starred_messages WHERE message_id = $1",
+)
+DELETE_STARRED_MESSAGES = Query(
+    "starboard.delete_starred_messages",
+    "DELETE FROM starred_messages WHERE message_id = ANY($1::bigint[])",
+)
+DELETE_GUILD_STARRED_MESSAGES = Query(
+    "starboard.delete_guild_starred_messages",
+    "DELETE FROM starred_messages WHERE guild_id = $1",
+)
+
+# statistics
+
+GUILD_STATS = Query(
+    "starboard.guild_stats",
+    """
+    SELECT total_starred,
+           total_stars::float / total_starred AS avg_stars,
+           max_stars,
+           total_stars,
+           top_message_url
+    FROM starboard_guild_stats
+    WHERE guild_id = $1
+    """,
+)
+AUTHOR_STATS = Query(
+    "starboard.author_stats",
+    """
+    SELECT total_starred,
+           total_stars::float / total_starred AS avg_stars,
+           max_stars,
+           total_stars,
+           top_message_url
+    FROM starboard_author_stats
+    WHERE guild_id = $1 AND author_id = $2
+    """,
+)
+
+# leaderboard pages continue after the sort key of the previous page's last row ($3, $4),
+# so any page is an index range scan no matter how deep it is
+
+LEADERBOARD_USERS_COUNT = Query(
+    "starboard.leaderboard_users_count",
+    "SELECT COUNT(*) FROM starboard_author_stats WHERE guild_id = $1",
+)
+LEADERBOARD_USERS_FIRST = Query(
+    "starboard.leaderboard_users_first",
+    """
+    SELECT author_id, total_stars, total_starred
+    FROM starboard_author_stats
+    WHERE guild_id = $1
+    ORDER BY total_stars DESC, author_id
+    LIMIT $2
+    """,
+)
+LEADERBOARD_USERS_NEXT = Query(
+    "starboard.leaderboard_users_next",
+    """
+    SELECT author_id, total_stars, total_starred
+    FROM starboard_author_stats
+    WHERE guild_id = $1 AND total_stars <= $3
+        AND (total_stars < $3 OR author_id > $4)
+    ORDER BY total_stars DESC, author_id
+    LIMIT $2
+    """,
+)
+LEADERBOARD_USERS_LAST = Query(
+    "starboard.leaderboard_users_last",
+    """
+    SELECT author_id, total_stars, total_starred
+    FROM starboard_author_stats
+    WHERE guild_id = $1
+    ORDER BY total_stars, author_id DESC
+    LIMIT $2
+    """,
+)
+LEADERBOARD_MESSAGES_COUNT = Query(
+    "starboard.leaderboard_messages_count",
+    "SELECT total_starred FROM starboard_guild_stats WHERE guild_id = $1",
+)
+LEADERBOARD_MESSAGES_FIRST = Query(
+    "starboard.leaderboard_messages_first",
+    """
+    SELECT message_id, channel_id, author_id, star_count
+    FROM starred_messages
+    WHERE guild_id = $1
+    ORDER BY star_count DESC, message_id
+    LIMIT $2
+    """,
+)
+LEADERBOARD_MESSAGES_NEXT = Query(
+    "starboard.leaderboard_messages_next",
+    """
+    SELECT message_id, channel_id, author_id, star_count
+    FROM starred_messages
+    WHERE guild_id = $1 AND star_count <= $3
+        AND (star_count < $3 OR message_id > $4)
+    ORDER BY star_count DESC, message_id
+    LIMIT $2
+    """,
+)
+LEADERBOARD_MESSAGES_LAST = Query(
+    "starboard.leaderboard_messages_last",
+    """
+    SELECT message_id, channel_id, author_id, star_count
+    FROM starred_messages
+    WHERE guild_id = $1
+    ORDER BY star_count, message_id DESC
+    LIMIT $2
+    """,
+)
+
+# backfill
+
+GET_BACKFILL_CHECKPOINT = Query(
+    "starboard.get_backfill_checkpoint",
+    """
+    SELECT last_message_id, done FROM starboard_backfill
+    WHERE guild_id = $1 AND channel_id = $2
+    """,
+)
+SET_BACKFILL_CHECKPOINT = Query(
+    "starboard.set_backfill_checkpoint",
+    """
+    INSERT INTO starboard_backfill (guild_id, channel_id, last_message_id, done)
+    VALUES ($1, $2, $3, $4)
+    ON CONFLICT (guild_id, channel_id)
+    DO UPDATE SET last_message_id = $3, done = $4
+    """,
+)
+# no starboard post exists for backfilled messages, so they link to the original message
+INSERT_BACKFILLED_MESSAGES = Query(
+    "starboard.insert_backfilled_messages",
+    """
+    INSERT INTO starred_messages
+    (message_id, guild_id, channel_id, author_id, starboard_message_url, star_count)
+    SELECT * FROM unnest($1::bigint[], $2::bigint[], $3::bigint[], $4::bigint[], $5::text[], $6::int[])
+    ON CONFLICT (message_id) DO NOTHING
+    """,
+)
@@ -1,20 +1,70 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
-
+import asyncio
+import logging
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from functools import partial
+from typing import TYPE_CHECKING, Literal
+
+import asyncpg
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from config import config
+from utils.paginator import LazyPaginator
+from utils.utils import Embed
 from utils.views import Confirm
 
+from . import queries
+from .backfill import Backfill
+from .edits import EditQueue
+from .leaderboard import Leaderboard
+from .messages import MessageCache
+from .tally import StarCount, StarTally, count_stars
+from .writer import StarCountWriter
+
 if TYPE_CHECKING:
     from main import OneBot
 
+# largest attachment re-uploaded to webhook posts, bigger ones are linked instead
+ATTACHMENT_SIZE_LIMIT = 8 * 1024 * 1024
+
+
+@dataclass(slots=True)
+class StarboardConfig:
+    """A guild's starboard configuration, as stored in the starboard table."""
+
+    channel_id: int
+    star_count: int
+    use_webhook: bool = False
+    webhook_id: int | None = None
+    webhook_token: str | None = None
+
 
 class Starboard(commands.Cog):
     def __init__(self, bot: OneBot):
         self.bot = bot
+        # guild_id: configuration, for every guild with a starboard
+        self.configs: dict[int, StarboardConfig] = {}
+        # starboard channel_id: webhook
+        self.webhooks: dict[int, discord.Webhook] = {}
+        # guild_id: running backfill
+        self.backfills: dict[int, Backfill] = {}
+        self.tally = StarTally()
+        self.messages = MessageCache(bot)
+        self.coalesce_window: float = config.get("starboard_coalesce_window", 1.0)
+        # message_id: in-flight pass, and messages with events it hasn't processed yet
+        self._passes: dict[int, asyncio.Task] = {}
+        self._dirty: set[int] = set()
+        self.writer = StarCountWriter(
+            bot.pool,
+            interval=config.get("starboard_write_interval", 1.0),
+            max_size=config.get("starboard_write_batch", 500),
+        )
+        self.edits = EditQueue(config.get("starboard_edit_interval", 5.0))
 
     async def cog_load(self):
         for cmd in self.walk_app_commands():
@@ -25,31 +75,62 @@ class Starboard(commands.Cog):
                 guild=True, dm_channel=False, private_channel=False
             )
 
-        if hasattr(self.bot, "pool"):
-            await self.bot.pool.execute(
-                """
-                CREATE TABLE IF NOT EXISTS starboard (
-                    guild_id BIGINT PRIMARY KEY,
-                    channel_id BIGINT NOT NULL,
-                    star_count INT DEFAULT 5
-                )
-                """
-            )
+        for row in await queries.GET_CONFIGS.fetch(self.bot.pool):
+            guild_id, *fields = row
+            self.configs[guild_id] = StarboardConfig(*fields)
 
-            # table for starred messages to prevent duplicates
-            await self.bot.pool.execute(
-                """
-                    CREATE TABLE IF NOT EXISTS starred_messages (
-                        message_id BIGINT PRIMARY KEY,
-                        guild_id BIGINT NOT NULL,
-                        channel_id BIGINT NOT NULL,
-                        author_id BIGINT NOT NULL,
-                        starboard_message_id BIGINT,
-                        starboard_message_url TEXT,
-                        star_count INT DEFAULT 0
-                    )
-                    """
+        self.writer.start()
+
+    async def cog_unload(self):
+        for task in self._passes.values():
+            task.cancel()
+        for backfill in self.backfills.values():
+            backfill.cancel()
+        self.edits.cancel()
+        await self.writer.stop()
+
+    def get_config(self, guild_id: int) -> StarboardConfig | None:
+        """Get a guild's starboard configuration.
+
+        Every configuration is loaded with the cog, so this never hits the database."""
+
+        return self.configs.get(guild_id)
+
+    async def get_webhook(
+        self,
+        guild_id: int,
+        configuration: StarboardConfig,
+        channel: discord.TextChannel,
+    ) -> discord.Webhook:
+        """Get the webhook used to post in a starboard channel, creating and storing it if needed."""
+
+        webhook = self.webhooks.get(channel.id)
+        if webhook:
+            return webhook
+
+        if configuration.webhook_id and configuration.webhook_token:
+            webhook = discord.Webhook.partial(
+                configuration.webhook_id, configuration.webhook_token, client=self.bot
+            )
+        else:
+            webhook = await channel.create_webhook(
+                name=f"{self.bot.user.name} Starboard", reason="Starboard posting"
+            )
+            await queries.SET_WEBHOOK.execute(
+                self.bot.pool, guild_id, webhook.id, webhook.token
             )
+            configuration.webhook_id = webhook.id
+            configuration.webhook_token = webhook.token
+
+        self.webhooks[channel.id] = webhook
+        return webhook
+
+    def forget_webhook(self, guild_id: int, channel_id: int) -> None:
+        """Stop using a starboard channel's webhook, e.g. after it was deleted."""
+
+        self.webhooks.pop(channel_id, None)
+        if configuration := self.configs.get(guild_id):
+            configuration.webhook_id = configuration.webhook_token = None
 
     # set starboard
     @app_commands.command(
@@ -58,6 +139,7 @@ class Starboard(commands.Cog):
     @app_commands.describe(
         channel="The channel to use as starboard",
         min_stars="Minimum number of stars required (default: 5)",
+        use_webhook="Post each message as a single webhook message (default: no)",
     )
     @app_commands.default_permissions(manage_guild=True)
     async def starboard_set(
@@ -65,9 +147,18 @@ class Starboard(commands.Cog):
         i: discord.Interaction,
         channel: discord.TextChannel,
         min_stars: app_commands.Range[int, 2, 20] = 5,
+        use_webhook: bool = False,
     ):
         await i.response.defer(ephemeral=True)
+        if use_webhook and not self.bot.intents.message_content:
+            raise RuntimeError(
+                "Webhook posts aren't available, as this bot can't read message content."
+            )
         channel_perms = channel.permissions_for(i.guild.me)
+        if use_webhook and not channel_perms.manage_webhooks:
+            raise RuntimeError(
+                "I need the Manage Webhooks permission in that channel to post with a webhook."
+            )
         if not channel_perms.send_messages:
             # try to set permissions if bot can't send messages
             if not channel_perms.manage_roles:
@@ -80,17 +171,21 @@ class Starboard(commands.Cog):
                 i.guild.me, overwrite=overwrite, reason="Setting up starboard"
             )
 
-        await self.bot.pool.execute(
-            """
-                INSERT INTO starboard (guild_id, channel_id, star_count) 
-                VALUES ($1, $2, $3)
-                ON CONFLICT (guild_id) 
-                DO UPDATE SET channel_id = $2, star_count = $3
-                """,
+        row = await queries.SET_CONFIG.fetchrow(
+            self.bot.pool,
             i.guild.id,
             channel.id,
             min_stars,
+            use_webhook,
         )
+        if i.guild.id not in self.configs:
+            # reactions in this guild weren't being counted until now
+            self.tally.distrust(i.guild.id)
+        configuration = self.configs[i.guild.id] = StarboardConfig(**row)
+        if not configuration.webhook_id:
+            self.webhooks.pop(channel.id, None)
+        if use_webhook:
+            await self.get_webhook(i.guild.id, configuration, channel)
 
         await i.followup.send(
             f"✅ Starboard has been set to {channel.mention} with a threshold of {min_stars} stars.\n"
@@ -103,9 +198,7 @@ class Starboard(commands.Cog):
         await i.response.defer(ephemeral=True)
 
         # check if starboard is configured
-        configuration = await self.bot.pool.fetchrow(
-            "SELECT channel_id FROM starboard WHERE guild_id = $1", i.guild.id
-        )
+        configuration = self.get_config(i.guild.id)
         if not configuration:
             raise RuntimeError("No starboard configuration found to disable.")
 
@@ -122,13 +215,9 @@ class Starboard(commands.Cog):
         if not view.accepted:
             return await msg.edit(content="Cancelled.", view=None)
 
-        await self.bot.pool.execute(
-            "DELETE FROM starboard WHERE guild_id = $1", i.guild.id
-        )
-        await self.bot.pool.execute(
-            "DELETE FROM starred_messages WHERE guild_id = $1",
-            i.guild.id,
-        )
+        await queries.DELETE_CONFIG.execute(self.bot.pool, i.guild.id)
+        self.configs.pop(i.guild.id, None)
+        await queries.DELETE_GUILD_STARRED_MESSAGES.execute(self.bot.pool, i.guild.id)
 
         await msg.edit(
             content="✅ Starboard and starred message data for this server have been removed."
@@ -141,42 +230,29 @@ class Starboard(commands.Cog):
     @starboard_group.command(description="View the current starboard configuration")
     async def view_config(self, i: discord.Interaction):
         await i.response.defer(ephemeral=True)
-        configuration = await self.bot.pool.fetchrow(
-            "SELECT channel_id, star_count FROM starboard WHERE guild_id = $1",
-            i.guild.id,
-        )
+        configuration = self.get_config(i.guild.id)
 
         if not configuration:
             raise RuntimeError(
                 "No starboard configuration found. Use `/starboard_set` to configure it."
             )
 
-        channel = i.guild.get_channel(configuration["channel_id"])
+        channel = i.guild.get_channel(configuration.channel_id)
         channel_mention = (
             channel.mention
             if channel
-            else f"<#{configuration['channel_id']}> (Channel not found)"
+            else f"<#{configuration.channel_id}> (Channel not found)"
         )
 
         embed = discord.Embed(title="Starboard Configuration", color=self.bot.colour)
         embed.add_field(name="Channel", value=channel_mention)
-        embed.add_field(name="Minimum Stars", value=str(configuration["star_count"]))
+        embed.add_field(name="Minimum Stars", value=str(configuration.star_count))
 
         await i.followup.send(embed=embed)
 
     @starboard_group.command(description="View starboard statistics for this server")
     async def server_stats(self, i: discord.Interaction):
-        stats = await self.bot.pool.fetchrow(
-            """
-                SELECT COUNT(*) as total_starred, 
-                       AVG(star_count) as avg_stars,
-                       MAX(star_count) as max_stars,
-                       SUM(star_count) as total_stars
-                FROM starred_messages 
-                WHERE guild_id = $1
-                """,
-            i.guild.id,
-        )
+        stats = await queries.GUILD_STATS.fetchrow(self.bot.pool, i.guild.id)
 
         if not stats or stats["total_starred"] == 0:
             await i.response.send_message(
@@ -184,18 +260,6 @@ class Starboard(commands.Cog):
             )
             return
 
-        most_starred_msg_url = (
-            await self.bot.pool.fetchrow(
-                """
-                SELECT starboard_message_url as url
-                FROM starred_messages 
-                WHERE guild_id = $1 AND star_count = $2
-            """,
-                i.guild.id,
-                stats["max_stars"],
-            )
-        )["url"]
-
         embed = discord.Embed(title="Starboard Statistics", color=self.bot.colour)
         embed.add_field(
             name="Total Starred Messages", value=str(stats["total_starred"])
@@ -203,7 +267,7 @@ class Starboard(commands.Cog):
         embed.add_field(name="Average Stars", value=f"⭐ {stats['avg_stars']:.1f}")
         embed.add_field(
             name="Most Starred Message",
-            value=f"🌟 {stats['max_stars']} ({most_starred_msg_url})",
+            value=f"🌟 {stats['max_stars']} ({stats['top_message_url']})",
         )
         embed.add_field(name="Total Stars", value=f"✨ {stats['total_stars']}")
 
@@ -217,18 +281,7 @@ class Starboard(commands.Cog):
 
         await i.response.defer()
 
-        stats = await self.bot.pool.fetchrow(
-            """
-                SELECT COUNT(*) as total_starred, 
-                       AVG(star_count) as avg_stars,
-                       MAX(star_count) as max_stars,
-                       SUM(star_count) as total_stars
-                FROM starred_messages 
-                WHERE guild_id = $1 AND author_id = $2
-                """,
-            i.guild.id,
-            user.id,
-        )
+        stats = await queries.AUTHOR_STATS.fetchrow(self.bot.pool, i.guild.id, user.id)
 
         if not stats or stats["total_starred"] == 0:
             await i.followup.send(
@@ -237,19 +290,6 @@ class Starboard(commands.Cog):
             )
             return
 
-        most_starred_msg_url = (
-            await self.bot.pool.fetchrow(
-                """
-                SELECT starboard_message_url as url
-                FROM starred_messages 
-                WHERE guild_id = $1 AND author_id = $2 AND star_count = $3
-            """,
-                i.guild.id,
-                user.id,
-                stats["max_stars"],
-            )
-        )["url"]
-
         embed = discord.Embed(
             title=f"{user.name}'s Starboard Statistics", color=self.bot.colour
         )
@@ -259,12 +299,93 @@ class Starboard(commands.Cog):
         embed.add_field(name="Average Stars", value=f"⭐ {stats['avg_stars']:.1f}")
         embed.add_field(
             name="Most Starred Message",
-            value=f"🌟 {stats['max_stars']} ({most_starred_msg_url})",
+            value=f"🌟 {stats['max_stars']} ({stats['top_message_url']})",
         )
         embed.add_field(name="Total Stars", value=f"✨ {stats['total_stars']}")
 
         await i.followup.send(embed=embed)
 
+    @starboard_group.command(description="View the most starred users or messages")
+    @app_commands.describe(rank_by="Rank users or messages (default: users)")
+    async def leaderboard(
+        self, i: discord.Interaction, rank_by: Literal["Users", "Messages"] = "Users"
+    ):
+        await i.response.defer()
+
+        leaderboard = Leaderboard(self.bot, i.guild.id, rank_by)
+        total = await leaderboard.count()
+        if not total:
+            raise RuntimeError("No starred messages found for this server.")
+
+        paginator = LazyPaginator(
+            interaction=i,
+            get_page=leaderboard.get_page,
+            total_pages=-(-total // leaderboard.per_page),
+        )
+        await paginator.start()
+
+    @starboard_group.command(
+        description="Add older messages that already have enough stars to the statistics"
+    )
+    @app_commands.describe(
+        channel="The channel to scan (default: all channels)",
+        days="How many days of history to scan (default: 30)",
+        restart="Scan from the start again instead of resuming (default: no)",
+    )
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def backfill(
+        self,
+        i: discord.Interaction,
+        channel: discord.TextChannel | None = None,
+        days: app_commands.Range[int, 1, 365] = 30,
+        restart: bool = False,
+    ):
+        await i.response.defer()
+
+        configuration = self.get_config(i.guild.id)
+        if not configuration:
+            raise RuntimeError(
+                "No starboard configuration found. Use `/starboard_set` to configure it."
+            )
+        if i.guild.id in self.backfills:
+            raise RuntimeError("A backfill is already running for this server.")
+
+        channels = [
+            c
+            for c in ([channel] if channel else i.guild.text_channels)
+            if c.id != configuration.channel_id
+            and c.permissions_for(i.guild.me).read_message_history
+        ]
+        if not channels:
+            raise RuntimeError("I can't read the message history of that channel.")
+
+        backfill = self.backfills[i.guild.id] = Backfill(
+            self.bot,
+            i.guild,
+            channels,
+            configuration.star_count,
+            datetime.now(UTC) - timedelta(days=days),
+            restart=restart,
+        )
+        msg = await i.followup.send(f"⏳ {backfill.progress()}", wait=True)
+
+        async def report_progress():
+            while True:
+                await asyncio.sleep(5)
+                # the interaction token expires after 15 minutes, stop reporting then
+                with suppress(discord.HTTPException):
+                    await msg.edit(content=f"⏳ {backfill.progress()}")
+
+        reporter = asyncio.create_task(report_progress())
+        try:
+            await backfill.run()
+        finally:
+            reporter.cancel()
+            del self.backfills[i.guild.id]
+
+        with suppress(discord.HTTPException):
+            await msg.edit(content=f"✅ Backfill complete. {backfill.progress()}")
+
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
         """Remove starboard configuration if the starboard channel is deleted"""
@@ -273,18 +394,14 @@ class Starboard(commands.Cog):
             return
 
         # Check if this channel was a starboard channel
-        configuration = await self.bot.pool.fetchrow(
-            "SELECT guild_id FROM starboard WHERE channel_id = $1", channel.id
-        )
+        guild_id = channel.guild.id
+        configuration = self.get_config(guild_id)
+        if not configuration or configuration.channel_id != channel.id:
+            return
 
-        if configuration:
-            await self.bot.pool.execute(
-                "DELETE FROM starboard WHERE guild_id = $1", configuration["guild_id"]
-            )
-            await self.bot.pool.execute(
-                "DELETE FROM starred_messages WHERE guild_id = $1",
-                configuration["guild_id"],
-            )
+        await queries.DELETE_CONFIG.execute(self.bot.pool, guild_id)
+        self.configs.pop(guild_id, None)
+        await queries.DELETE_GUILD_STARRED_MESSAGES.execute(self.bot.pool, guild_id)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -294,58 +411,169 @@ class Starboard(commands.Cog):
     async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
         await self.handle_reaction_change(payload)
 
-    async def handle_reaction_change(self, payload: discord.RawReactionActionEvent):
-        """Handle reaction changes for starboard functionality"""
-        if not payload.guild_id:
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.guild_id not in self.configs:
             return
+        self.forget(payload.channel_id, payload.message_id)
+        await queries.DELETE_STARRED_MESSAGE.execute(self.bot.pool, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(
+        self, payload: discord.RawBulkMessageDeleteEvent
+    ):
+        if payload.guild_id not in self.configs:
+            return
+        self.forget(payload.channel_id, *payload.message_ids)
+        await queries.DELETE_STARRED_MESSAGES.execute(
+            self.bot.pool, list(payload.message_ids)
+        )
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear(self, payload: discord.RawReactionClearEvent):
+        await self.reset_stars(payload.guild_id, payload.channel_id, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear_emoji(
+        self, payload: discord.RawReactionClearEmojiEvent
+    ):
         if str(payload.emoji) != "⭐":
             return
-        guild = self.bot.get_guild(payload.guild_id)
-        if not guild:
+        await self.reset_stars(payload.guild_id, payload.channel_id, payload.message_id)
+
+    def forget(self, channel_id: int, *message_ids: int) -> None:
+        """Drop everything held in memory about deleted messages in a channel.
+
+        The messages can be starred messages, or starboard posts whose pending edits are
+        dropped."""
+
+        self.writer.discard(*message_ids)
+        for message_id in message_ids:
+            self.tally.discard(message_id)
+            self._dirty.discard(message_id)
+            self.edits.discard(channel_id, message_id)
+
+    async def reset_stars(self, guild_id: int | None, channel_id: int, message_id: int):
+        """Set a message's star count to 0 after its reactions were cleared."""
+
+        configuration = self.get_config(guild_id)
+        if not configuration or channel_id == configuration.channel_id:
             return
 
-        # Get starboard config for this guild
-        configuration = await self.bot.pool.fetchrow(
-            "SELECT channel_id, star_count FROM starboard WHERE guild_id = $1",
-            payload.guild_id,
+        if count := self.tally.get(message_id):
+            count.stars = 0
+        starred_message = await queries.GET_STARRED_MESSAGE.fetchrow(
+            self.bot.pool, message_id
         )
-        if not configuration:
+        if not starred_message:
+            return
+
+        guild = self.bot.get_guild(guild_id)
+        starboard_channel = guild and guild.get_channel(configuration.channel_id)
+        if not starboard_channel:
+            return
+        await self.update_post(
+            guild_id, configuration, starboard_channel, starred_message, message_id, 0
+        )
+
+    async def reconcile(self, message: discord.Message) -> StarCount:
+        """Count the stars on a fetched message and store the result in the tally."""
+
+        stars = await count_stars(message)
+        return self.tally.set(message.id, message.author.id, stars)
+
+    async def handle_reaction_change(self, payload: discord.RawReactionActionEvent):
+        """Handle reaction changes for starboard functionality"""
+        if not payload.guild_id:
+            return
+        if str(payload.emoji) != "⭐":
             return
 
-        channel = guild.get_channel(payload.channel_id)
-        if not channel or channel.id == configuration["channel_id"]:
+        configuration = self.get_config(payload.guild_id)
+        if not configuration or payload.channel_id == configuration.channel_id:
             return  # don't star messages in the starboard channel itself
 
+        # count the star now so the next pass for this message includes it
+        self.tally.apply(payload)
+        self._dirty.add(payload.message_id)
+
+        task = self._passes.get(payload.message_id)
+        if task is None:
+            task = asyncio.create_task(
+                self.coalesce(payload.guild_id, payload.channel_id, payload.message_id)
+            )
+            self._passes[payload.message_id] = task
+        # events for a message that is already being processed wait for its pass
+        await asyncio.shield(task)
+
+    async def coalesce(self, guild_id: int, channel_id: int, message_id: int):
+        """Process all reaction events a message gets within the coalescing window in a single pass.
+
+        Only one pass runs per message at a time, so a message can't be posted to the
+        starboard twice."""
+
         try:
-            message = await channel.fetch_message(payload.message_id)
-        except discord.NotFound:
+            while message_id in self._dirty:
+                await asyncio.sleep(self.coalesce_window)
+                self._dirty.discard(message_id)
+                try:
+                    await self.process_reactions(guild_id, channel_id, message_id)
+                except Exception:
+                    logging.exception(f"Starboard pass for message {message_id} failed")
+        finally:
+            self._passes.pop(message_id, None)
+
+    async def process_reactions(self, guild_id: int, channel_id: int, message_id: int):
+        """Update the starboard for a message after its star count has changed."""
+
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
             return
 
-        for reaction in message.reactions:
-            if str(reaction.emoji) == "⭐":
-                star_count = reaction.count
-                async for u in reaction.users():
-                    if u.id == message.author.id:
-                        star_count -= 1  # don't count the author's own reaction
-                        break
-                break
-        if star_count < configuration["star_count"]:
+        configuration = self.get_config(guild_id)
+        if not configuration:
             return
 
+        channel = guild.get_channel(channel_id)
+        if not channel:
+            return
+
+        # only fetch the message if its count is unknown
+        message = None
+        count = self.tally.get(message_id)
+        if count is None:
+            try:
+                message = await self.messages.get(channel, message_id)
+            except discord.NotFound:
+                return
+            count = await self.reconcile(message)
+
         # check if message is already in starboard
-        starred_message = await self.bot.pool.fetchrow(
-            "SELECT starboard_message_id, star_count FROM starred_messages WHERE message_id = $1",
-            payload.message_id,
+        starred_message = await queries.GET_STARRED_MESSAGE.fetchrow(
+            self.bot.pool, message_id
         )
+        # posts keep following the count after it drops below the threshold
+        if not starred_message and count.stars < configuration.star_count:
+            return
 
-        starboard_channel = guild.get_channel(configuration["channel_id"])
+        starboard_channel = guild.get_channel(configuration.channel_id)
         if not starboard_channel:
-            await self.bot.pool.execute(
-                "DELETE FROM starboard WHERE guild_id = $1", payload.guild_id
-            )
+            await queries.DELETE_CONFIG.execute(self.bot.pool, guild_id)
+            self.configs.pop(guild_id, None)
             return
 
         if not starred_message:
+            # the message is about to be posted, so make sure the count is accurate
+            if message is None:
+                try:
+                    message = await self.messages.get(channel, message_id)
+                except discord.NotFound:
+                    self.tally.discard(message_id)
+                    return
+                count = await self.reconcile(message)
+                if count.stars < configuration.star_count:
+                    return
+
             # create new starboard entry
             if not starboard_channel.permissions_for(guild.me).send_messages:
                 try:
@@ -356,39 +584,206 @@ class Starboard(commands.Cog):
                     )
                 except discord.Forbidden:
                     return
-            starboard_msg = await message.forward(starboard_channel)
-            await starboard_channel.send(
-                rf"*\- {message.author.mention}, <t:{message.created_at.timestamp():.0f}:f>*"
+            starboard_msg, caption_msg = await self.post(
+                guild.id, configuration, starboard_channel, message, count.stars
             )
+            if not starboard_msg:
+                return
 
-            await self.bot.pool.execute(
-                """
-                INSERT INTO starred_messages 
-                (message_id, starboard_message_url, guild_id, channel_id, author_id, starboard_message_id, star_count)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                """,
+            await queries.INSERT_STARRED_MESSAGE.execute(
+                self.bot.pool,
                 message.id,
                 starboard_msg.jump_url,
                 guild.id,
                 channel.id,
                 message.author.id,
                 starboard_msg.id,
-                star_count,
+                count.stars,
+                caption_msg.id,
             )
         else:
-            # update existing starboard entry
-            if starred_message["star_count"] != star_count:
+            await self.update_post(
+                guild_id,
+                configuration,
+                starboard_channel,
+                starred_message,
+                message_id,
+                count.stars,
+            )
+
+    async def update_post(
+        self,
+        guild_id: int,
+        configuration: StarboardConfig,
+        starboard_channel: discord.TextChannel,
+        starred_message: asyncpg.Record,
+        message_id: int,
+        stars: int,
+    ):
+        """Store a starred message's new star count and queue an edit of its starboard post."""
+
+        if self.writer.get(message_id, starred_message["star_count"]) == stars:
+            return
+        self.writer.set(message_id, stars)
+
+        caption_id = starred_message["starboard_caption_id"]
+        if not caption_id:
+            return
+        webhook = None
+        if caption_id == starred_message["starboard_message_id"]:
+            # posted with a webhook, which is needed to edit it
+            if not configuration.webhook_id:
+                return
+            webhook = await self.get_webhook(guild_id, configuration, starboard_channel)
+
+        self.edits.submit(
+            starboard_channel.id,
+            caption_id,
+            partial(
+                self.edit_caption,
+                starboard_channel,
+                webhook,
+                caption_id,
+                message_id,
+                starred_message["author_id"],
+                stars,
+            ),
+        )
+
+    async def post(
+        self,
+        guild_id: int,
+        configuration: StarboardConfig,
+        starboard_channel: discord.TextChannel,
+        message: discord.Message,
+        stars: int,
+    ) -> tuple[discord.Message | None, discord.Message | None]:
+        """Post a message to the starboard.
+
+        With a webhook, the post is a single message that also holds the caption. Otherwise, the
+        message is forwarded and followed by a caption message. Messages whose content can't be
+        read are always forwarded.
+
+        :return: The post and its caption message, or (None, None) if the webhook was deleted.
+        :rtype: tuple[Optional[discord.Message], Optional[discord.Message]]"""
+
+        # without the message content intent, other users' messages arrive empty
+        if configuration.use_webhook and (message.content or message.attachments):
+            try:
+                webhook = await self.get_webhook(
+                    guild_id, configuration, starboard_channel
+                )
+            except discord.Forbidden:
+                webhook = None  # missing Manage Webhooks, forward instead
+
+            if webhook:
+                embed, files = await self.build_post(
+                    message, starboard_channel.guild.filesize_limit
+                )
                 try:
-                    starboard_msg = await starboard_channel.fetch_message(
-                        starred_message["starboard_message_id"]
-                    )
-                    await self.bot.pool.execute(
-                        "UPDATE starred_messages SET star_count = $1 WHERE message_id = $2",
-                        star_count,
-                        message.id,
+                    post = await webhook.send(
+                        self.caption(message.author.id, message.id, stars),
+                        embed=embed,
+                        files=files,
+                        wait=True,
                     )
                 except discord.NotFound:
-                    await self.bot.pool.execute(
-                        "DELETE FROM starred_messages WHERE message_id = $1",
-                        message.id,
+                    # the webhook was deleted, a new one is created for the next post
+                    self.forget_webhook(guild_id, starboard_channel.id)
+                    await queries.SET_WEBHOOK.execute(
+                        self.bot.pool, guild_id, None, None
                     )
+                    return None, None
+                return post, post
+
+        starboard_msg = await message.forward(starboard_channel)
+        caption_msg = await starboard_channel.send(
+            self.caption(message.author.id, message.id, stars)
+        )
+        return starboard_msg, caption_msg
+
+    @staticmethod
+    async def build_post(
+        message: discord.Message, size_limit: int
+    ) -> tuple[discord.Embed, list[discord.File]]:
+        """Build a webhook starboard post with a message's author, content, attachments and link.
+
+        :param size_limit: The most bytes of attachments the post can upload, usually the guild's filesize_limit.
+        :type size_limit: int"""
+
+        embed = Embed(
+            description=message.content or None,
+            colour=message.author.colour.value or None,
+            timestamp=message.created_at,
+        )
+        embed.set_author(
+            name=message.author.display_name,
+            icon_url=message.author.display_avatar.url,
+            url=message.jump_url,
+        )
+
+        # re-upload attachments so they don't depend on the original message's expiring URLs
+        files = []
+        links = []
+        # the upload limit applies to all of a message's files together
+        total_size = 0
+        for attachment in message.attachments:
+            if (
+                len(files) < 10
+                and attachment.size <= ATTACHMENT_SIZE_LIMIT
+                and total_size + attachment.size <= size_limit
+            ):
+                file = await attachment.to_file()
+                files.append(file)
+                total_size += attachment.size
+                if not embed.image and (attachment.content_type or "").startswith(
+                    "image/"
+                ):
+                    embed.set_image(url=f"attachment://{file.filename}")
+            else:
+                links.append(f"[{attachment.filename}]({attachment.url})")
+        if links:
+            embed.add_field(name="Attachments", value="\n".join(links), inline=False)
+
+        embed.add_field(name="Original", value=f"[Jump to message]({message.jump_url})")
+        return embed, files
+
+    @staticmethod
+    def caption(author_id: int, message_id: int, stars: int) -> str:
+        """The caption of a starboard post, with the author, time and star count."""
+
+        created_at = discord.utils.snowflake_time(message_id)
+        return (
+            rf"⭐ **{stars}** | *\- <@{author_id}>, <t:{created_at.timestamp():.0f}:f>*"
+        )
+
+    async def edit_caption(
+        self,
+        starboard_channel: discord.TextChannel,
+        webhook: discord.Webhook | None,
+        caption_id: int,
+        message_id: int,
+        author_id: int,
+        stars: int,
+    ):
+        """Show a new star count on a starboard post."""
+
+        content = self.caption(author_id, message_id, stars)
+        try:
+            if webhook:
+                await webhook.edit_message(
+                    caption_id,
+                    content=content,
+                    allowed_mentions=discord.AllowedMentions.none(),
+                )
+            else:
+                await starboard_channel.get_partial_message(caption_id).edit(
+                    content=content,
+                    allowed_mentions=discord.AllowedMentions.none(),
+                )
+        except discord.NotFound:
+            # the post was deleted, allow the message to be posted again
+            self.edits.discard(starboard_channel.id, caption_id)
+            self.writer.discard(message_id)
+            self.tally.discard(message_id)
+            await queries.DELETE_STARRED_MESSAGE.execute(self.bot.pool, message_id)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+import discord
+
+
+@dataclass(slots=True)
+class StarCount:
+    """Star count of a message, not including its author's own star."""
+
+    author_id: int
+    stars: int
+
+
+async def count_stars(message: discord.Message) -> int:
+    """Count the stars on a fetched message, not including its author's own star."""
+
+    for reaction in message.reactions:
+        if str(reaction.emoji) == "⭐":
+            stars = reaction.count
+            # users are sorted by ID, so this only fetches the author if they reacted
+            async for u in reaction.users(
+                limit=1, after=discord.Object(id=message.author.id - 1)
+            ):
+                if u.id == message.author.id:
+                    stars -= 1  # don't count the author's own reaction
+            return stars
+    return 0
+
+
+class StarTally:
+    """Bounded, in-memory star counts maintained from raw reaction events.
+
+    Counts are only trusted for messages whose reactions have all been seen by this tally:
+    messages sent after it was created (or after their guild was distrusted), or messages that
+    have been reconciled with `set`.
+
+    :param max_size: The maximum number of messages to track, defaults to 10000.
+    :type max_size: int"""
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._counts: OrderedDict[int, StarCount] = OrderedDict()
+        # messages with an ID above this have had all their reactions seen
+        self._trusted_after = discord.utils.time_snowflake(datetime.now(UTC))
+        # guild_id: the same, for guilds that started being tallied after the tally was created
+        self._guilds_trusted_after: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def get(self, message_id: int) -> StarCount | None:
+        count = self._counts.get(message_id)
+        if count is not None:
+            self._counts.move_to_end(message_id)
+        return count
+
+    def set(self, message_id: int, author_id: int, stars: int) -> StarCount:
+        """Set the reconciled star count of a message."""
+
+        count = StarCount(author_id, stars)
+        self._counts[message_id] = count
+        self._counts.move_to_end(message_id)
+        self._evict()
+        return count
+
+    def discard(self, message_id: int) -> None:
+        self._counts.pop(message_id, None)
+
+    def distrust(self, guild_id: int) -> None:
+        """Only trust counts of a guild's messages sent from now on.
+
+        Reactions in guilds without a starboard aren't applied, so this has to be called when a
+        guild enables it."""
+
+        self._guilds_trusted_after[guild_id] = discord.utils.time_snowflake(
+            datetime.now(UTC)
+        )
+
+    def apply(self, payload: discord.RawReactionActionEvent) -> StarCount | None:
+        """Apply a star reaction event to the tally.
+
+        :return: The updated count, or None if the message's count is unknown and has to be reconciled.
+        :rtype: Optional[StarCount]"""
+
+        count = self.get(payload.message_id)
+        if count is None:
+            trusted_after = max(
+                self._trusted_after,
+                self._guilds_trusted_after.get(payload.guild_id, 0),
+            )
+            if (
+                payload.message_id <= trusted_after
+                or payload.event_type != "REACTION_ADD"
+                or payload.message_author_id is None
+            ):
+                return None
+            count = self.set(payload.message_id, payload.message_author_id, 0)
+
+        # don't count the author's own reaction
+        if payload.user_id == count.author_id:
+            return count
+
+        if payload.event_type == "REACTION_ADD":
+            count.stars += 1
+        else:
+            count.stars = max(count.stars - 1, 0)
+        return count
+
+    def _evict(self) -> None:
+        while len(self._counts) > self.max_size:
+            message_id, _ = self._counts.popitem(last=False)
+            # reactions to the evicted message will no longer be seen
+            self._trusted_after = max(self._trusted_after, message_id)
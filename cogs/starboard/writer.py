@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import suppress
+from time import perf_counter
+
+import asyncpg
+
+from utils.metrics import Gauge, Histogram
+
+from .queries import UPDATE_STAR_COUNTS
+
+FLUSH_SIZE = Histogram(
+    "starboard_flush_size",
+    "Star counts written per starred_messages flush",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+FLUSH_SECONDS = Histogram(
+    "starboard_flush_seconds", "Time taken to write a batch of star counts"
+)
+BACKLOG = Gauge("starboard_flush_backlog", "Star counts waiting to be written")
+
+
+class StarCountWriter:
+    """Write-behind buffer for the star counts of starred messages.
+
+    Only the latest count per message is kept. Buffered counts are written in a single
+    statement every `interval` seconds, or as soon as `max_size` counts are waiting.
+
+    :param pool: The pool to write with.
+    :type pool: asyncpg.Pool
+    :param interval: Seconds between flushes, defaults to 1.
+    :type interval: float
+    :param max_size: Number of buffered counts that triggers an early flush, defaults to 500.
+    :type max_size: int"""
+
+    def __init__(self, pool: asyncpg.Pool, interval: float = 1.0, max_size: int = 500):
+        self.pool = pool
+        self.interval = interval
+        self.max_size = max_size
+        # message_id: star_count
+        self._buffer: dict[int, int] = {}
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        BACKLOG.set_function(lambda: len(self._buffer))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop flushing periodically and write whatever is left in the buffer."""
+
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        await self.flush()
+
+    def set(self, message_id: int, star_count: int) -> None:
+        self._buffer[message_id] = star_count
+        if len(self._buffer) >= self.max_size:
+            self._wakeup.set()
+
+    def get(self, message_id: int, default: int | None = None) -> int | None:
+        """Get the buffered star count of a message, if it hasn't been written yet."""
+
+        return self._buffer.get(message_id, default)
+
+    def discard(self, *message_ids: int) -> None:
+        for message_id in message_ids:
+            self._buffer.pop(message_id, None)
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, {}
+
+            start = perf_counter()
+            try:
+                await UPDATE_STAR_COUNTS.execute(
+                    self.pool, list(batch.keys()), list(batch.values())
+                )
+            except Exception:
+                # keep the batch for the next flush, without overwriting newer counts
+                for message_id, star_count in batch.items():
+                    self._buffer.setdefault(message_id, star_count)
+                raise
+
+            FLUSH_SECONDS.observe(perf_counter() - start)
+            FLUSH_SIZE.observe(len(batch))
+
+    async def _run(self) -> None:
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Failed to write starboard star counts")
@@ -1,13 +1,14 @@
 import zoneinfo
 
 import discord
-from googletrans import LANGUAGES as lang_dict
+
+from utils.utils import get_languages
 
 
 async def lang_autocomplete(
     _: discord.Interaction, current: str
 ) -> list[discord.app_commands.Choice[str]]:
-    langs = lang_dict.values()
+    langs = get_languages().values()
     return [
         discord.app_commands.Choice(name=lang.title(), value=lang)
         for lang in langs
@@ -13,7 +13,7 @@ from discord import app_commands
 from discord.ext import commands
 
 from utils.paginator import Paginator
-from utils.utils import Embed, lang_dict, translator
+from utils.utils import Embed, get_languages, get_translator
 
 from .autocompletes import lang_autocomplete, timezone_autocomplete
 
@@ -298,6 +298,7 @@ class Utilities(commands.Cog):
     ):
         if to == source:
             raise RuntimeError("Source and destination languages cannot be the same")
+        lang_dict = get_languages()
         if to not in lang_dict and to not in lang_dict.values():
             raise RuntimeError("Invalid destination language")
         if (
@@ -309,7 +310,7 @@ class Utilities(commands.Cog):
 
         await i.response.defer()
 
-        translation = await translator.translate(text, dest=to, src=source)
+        translation = await get_translator().translate(text, dest=to, src=source)
         detected_lang_name = lang_dict.get(translation.src.lower(), "Unknown").title()
         output_lang_name = lang_dict.get(translation.dest.lower(), "Unknown").title()
 
@@ -0,0 +1,183 @@
+"""Run the bot as several processes, each running a share of the shards.
+
+Use `python launcher.py` instead of `python main.py`. The launcher restarts clusters that exit
+and relays requests between them (see utils/cluster.py)."""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import Connection, wait
+
+from aiohttp import ClientSession
+
+from config import config
+
+# spawn gives every cluster a fresh interpreter instead of a copy of the launcher
+mp = multiprocessing.get_context("spawn")
+
+
+def run_cluster(
+    cluster_id: int,
+    cluster_count: int,
+    shard_ids: list[int],
+    shard_count: int,
+    conn: Connection,
+) -> None:
+    from main import OneBot
+    from utils import runtime
+    from utils.cluster import ClusterClient
+    from utils.logs import setup_logging
+
+    listener = setup_logging()
+    runtime.install()
+    bot = OneBot(
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+        cluster=ClusterClient(cluster_id, cluster_count, conn),
+    )
+    try:
+        bot.run(config["token"], log_handler=None)
+    finally:
+        listener.stop()
+
+
+async def recommended_shard_count() -> int:
+    async with (
+        ClientSession() as session,
+        session.get(
+            "https://discord.com/api/v10/gateway/bot",
+            headers={"Authorization": f"Bot {config['token']}"},
+        ) as r,
+    ):
+        r.raise_for_status()
+        return (await r.json())["shards"]
+
+
+class Cluster:
+    """A cluster process and the launcher's end of its pipe."""
+
+    def __init__(
+        self, cluster_id: int, count: int, shard_ids: list[int], shard_count: int
+    ):
+        self.id = cluster_id
+        self.args = (cluster_id, count, shard_ids, shard_count)
+        self.start()
+
+    def start(self) -> None:
+        self.conn, child_conn = mp.Pipe()
+        self.process = mp.Process(
+            target=run_cluster,
+            args=(*self.args, child_conn),
+            name=f"cluster-{self.id}",
+        )
+        self.process.start()
+        child_conn.close()
+        logging.info(f"Started cluster {self.id} (shards {self.args[2]}).")
+
+
+class Launcher:
+    """Start the clusters, restart them when they exit and relay their requests.
+
+    :param cluster_count: The number of processes to split the shards across.
+    :type cluster_count: int
+    :param shard_count: The total number of shards.
+    :type shard_count: int"""
+
+    def __init__(self, cluster_count: int, shard_count: int):
+        cluster_count = min(cluster_count, shard_count)
+        per_cluster = -(-shard_count // cluster_count)
+        self.clusters = {
+            cluster_id: Cluster(
+                cluster_id,
+                cluster_count,
+                list(range(first, min(first + per_cluster, shard_count))),
+                shard_count,
+            )
+            for cluster_id, first in enumerate(range(0, shard_count, per_cluster))
+        }
+        # (cluster_id, request_id): clusters yet to reply
+        self.pending: dict[tuple[int, int], set[int]] = {}
+
+    def run(self) -> None:
+        try:
+            while True:
+                by_conn = {c.conn: c for c in self.clusters.values()}
+                by_sentinel = {c.process.sentinel: c for c in self.clusters.values()}
+                for ready in wait([*by_conn, *by_sentinel]):
+                    if ready in by_sentinel:
+                        self.restart(by_sentinel[ready])
+                        continue
+                    cluster = by_conn[ready]
+                    try:
+                        message = ready.recv()
+                    except (EOFError, OSError):
+                        continue  # the process has exited, its sentinel handles it
+                    self.handle(cluster, message)
+        except KeyboardInterrupt:
+            # the clusters get the interrupt too and shut down by themselves
+            for cluster in self.clusters.values():
+                cluster.process.join(30)
+                if cluster.process.is_alive():
+                    cluster.process.terminate()
+
+    def handle(self, cluster: Cluster, message: tuple) -> None:
+        op, *data = message
+        if op == "request":
+            request_id, name, args = data
+            token = (cluster.id, request_id)
+            self.pending[token] = set(self.clusters)
+            for c in self.clusters.values():
+                self.send(c, ("call", token, name, args))
+        elif op == "reply":
+            token, ok, value = data
+            if token in self.pending:
+                # pass replies on as they arrive, so a requester that times out keeps them
+                origin, request_id = token
+                self.send(
+                    self.clusters[origin],
+                    ("result", request_id, cluster.id, ok, value),
+                )
+                self.pending[token].discard(cluster.id)
+                self.complete(token)
+
+    def complete(self, token: tuple[int, int]) -> None:
+        """Tell the cluster that made a request that it's done, if every cluster has replied."""
+
+        if self.pending[token]:
+            return
+        del self.pending[token]
+        origin, request_id = token
+        self.send(self.clusters[origin], ("done", request_id))
+
+    def send(self, cluster: Cluster, message: tuple) -> None:
+        try:
+            cluster.conn.send(message)
+        except OSError:
+            pass  # the process has exited, its sentinel handles it
+
+    def restart(self, cluster: Cluster) -> None:
+        logging.error(
+            f"Cluster {cluster.id} exited with code {cluster.process.exitcode}, restarting."
+        )
+        cluster.conn.close()
+        # don't spin if the cluster fails on startup
+        time.sleep(5)
+        # its requests are abandoned, and other requests stop waiting for it
+        for token in list(self.pending):
+            if token[0] == cluster.id:
+                del self.pending[token]
+                continue
+            self.pending[token].discard(cluster.id)
+            self.complete(token)
+        cluster.start()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s launcher: %(message)s"
+    )
+    shard_count = config.get("shard_count") or asyncio.run(recommended_shard_count())
+    launcher = Launcher(config.get("clusters") or os.cpu_count() or 1, shard_count)
+    launcher.run()
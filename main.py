@@ -1,31 +1,56 @@
+import asyncio
+import hashlib
+import json
 import logging
+from pathlib import Path
+from time import perf_counter
 
 import asyncpg
 import discord
-from aiohttp import ClientSession
 from discord.ext import commands
 
 from cogs import EXTENSIONS
 from config import config
+from utils import metrics, runtime
+from utils.cluster import LocalCluster
+from utils.db import watch_pool
+from utils.gauges import GATEWAY_LATENCY, GUILDS, STARTUP_SECONDS, VIEWS
+from utils.http import HTTPClient
+from utils.lag import LagMonitor
+from utils.logs import setup_logging
+from utils.migrations import migrate
+from utils.tree import InstrumentedTree, discord_trace, record_command
+from utils.views import live_views
+
+# hash of the last synced command tree
+TREE_HASH_FILE = Path(__file__).parent / ".tree_hash"
 
 
 class OneBot(commands.AutoShardedBot):
     """1Bot's AutoShardedBot subclass"""
 
-    session: ClientSession
+    session: HTTPClient
     pool: asyncpg.Pool
     # Global embed colour
     colour = 0xFF7000
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, cluster: LocalCluster | None = None, **kwargs):
+        # the launcher passes the cluster's connection, otherwise this is the only process
+        self.cluster = cluster or LocalCluster()
+        intents = discord.Intents.default()
+        # privileged, only needed to show message content in webhook starboard posts
+        intents.message_content = config.get("message_content_intent", False)
         super().__init__(
             *args,
             **kwargs,
             # Prefix for owner-only commands
             command_prefix=commands.when_mentioned,
             help_command=None,
+            tree_cls=InstrumentedTree,
+            http_trace=discord_trace(),
+            max_messages=config.get("max_messages", 1000),
             case_insensitive=True,
-            intents=discord.Intents.default(),
+            intents=intents,
             allowed_mentions=discord.AllowedMentions(everyone=False),
             allowed_installs=discord.app_commands.AppInstallationType(
                 guild=True, user=True
@@ -37,16 +62,119 @@ class OneBot(commands.AutoShardedBot):
 
     async def setup_hook(self) -> None:
         logging.info("Starting up...")
+        logging.info(runtime.describe())
+        self.started_at = perf_counter()
+
+        self.lag_monitor = LagMonitor(
+            interval=config.get("loop_lag_interval", 0.5),
+            threshold=config.get("loop_block_threshold", 0.25),
+        )
+        self.lag_monitor.start()
+
+        self.cluster.start()
+        self.cluster.register("guild_count", self.get_guild_count)
+
+        GATEWAY_LATENCY.set_function(
+            lambda: {(str(shard),): latency for shard, latency in self.latencies}
+        )
+        GUILDS.set_function(lambda: len(self.guilds))
+        # discord.py has no public way to list active views
+        VIEWS.set_function(lambda: len(live_views(self)))
+        if (port := config.get("metrics_port")) is not None:
+            # each cluster serves its metrics on the next port
+            self.metrics_runner = await metrics.serve(
+                config.get("metrics_host", "127.0.0.1"), port + self.cluster.id
+            )
 
         if config.get("postgres_dsn"):
-            self.pool = await asyncpg.create_pool(config["postgres_dsn"], timeout=30)
+            start = perf_counter()
+            self.pool = await asyncpg.create_pool(
+                config["postgres_dsn"], timeout=30, **config.get("postgres_pool", {})
+            )
+            watch_pool(self.pool)
+            STARTUP_SECONDS.set(perf_counter() - start, step="postgres")
+
+            start = perf_counter()
+            await migrate(self.pool)
+            STARTUP_SECONDS.set(perf_counter() - start, step="migrations")
+
+        self.session = HTTPClient(config.get("http"))
+
+        # Load jishaku and cogs. They don't depend on each other, so their
+        # cog_load I/O can overlap
+        await asyncio.gather(
+            *(self.load_extension_timed(ext) for ext in ["jishaku", *EXTENSIONS])
+        )
+
+        # clusters share one command tree, the first one syncs it
+        if self.cluster.id == 0:
+            start = perf_counter()
+            await self.sync_tree()
+            STARTUP_SECONDS.set(perf_counter() - start, step="tree_sync")
+
+        STARTUP_SECONDS.set(perf_counter() - self.started_at, step="setup_hook")
+
+    async def load_extension_timed(self, extension: str) -> None:
+        start = perf_counter()
+        await self.load_extension(extension)
+        STARTUP_SECONDS.set(perf_counter() - start, step=f"extension:{extension}")
+
+    def tree_hash(self) -> str:
+        """Hash the payload that syncing the global command tree would send."""
+
+        payload = {
+            "application_id": self.application_id,
+            "commands": [cmd.to_dict(self.tree) for cmd in self.tree.get_commands()],
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    async def sync_tree(self) -> None:
+        """Sync the global command tree, unless it's unchanged since the last sync."""
+
+        tree_hash = self.tree_hash()
+        try:
+            if TREE_HASH_FILE.read_text().strip() == tree_hash:
+                logging.info("Command tree unchanged, not syncing.")
+                return
+        except FileNotFoundError:
+            pass
+
+        start = perf_counter()
+        try:
+            synced = await self.tree.sync()
+        except discord.HTTPException:
+            logging.exception("Failed to sync the command tree")
+            return
+        TREE_HASH_FILE.write_text(tree_hash)
+        logging.info(
+            f"Synced {len(synced)} commands in {perf_counter() - start:.2f} s."
+        )
 
-        self.session = ClientSession()
+    def log_startup_report(self) -> None:
+        """Log how long each startup step took, slowest first. Steps overlap, so they don't add up."""
 
-        # Load jishaku and cogs
-        await self.load_extension("jishaku")
-        for extension in EXTENSIONS:
-            await self.load_extension(extension)
+        steps = sorted(
+            STARTUP_SECONDS.samples(), key=lambda sample: sample[2], reverse=True
+        )
+        lines = [f"{step:<40} {seconds:>7.3f} s" for _, (step,), seconds in steps]
+        logging.info("Startup report:\n" + "\n".join(lines))
+
+    async def get_guild_count(self) -> int:
+        return len(self.guilds)
+
+    async def total_guild_count(self) -> int:
+        """Get the number of guilds across all clusters."""
+
+        counts = await self.cluster.request("guild_count")
+        return sum(counts.values())
+
+    async def on_app_command_completion(
+        self,
+        interaction: discord.Interaction,
+        command: discord.app_commands.Command | discord.app_commands.ContextMenu,
+    ) -> None:
+        record_command(interaction, "ok")
 
     async def on_connect(self) -> None:
         self.user: discord.ClientUser
@@ -54,10 +182,21 @@ class OneBot(commands.AutoShardedBot):
 
     async def on_ready(self) -> None:
         logging.info("Ready: Client is now fully initialised.")
+        if not STARTUP_SECONDS.get(step="ready"):
+            STARTUP_SECONDS.set(perf_counter() - self.started_at, step="ready")
+            self.log_startup_report()
 
     async def close(self) -> None:
         logging.info("Shutting down.")
 
+        # write buffered starboard counts before the pool is closed
+        if starboard := self.get_cog("Starboard"):
+            await starboard.writer.stop()
+
+        if hasattr(self, "metrics_runner"):
+            await self.metrics_runner.cleanup()
+        if hasattr(self, "lag_monitor"):
+            await self.lag_monitor.stop()
         if hasattr(self, "session"):
             await self.session.close()
         if hasattr(self, "pool"):
@@ -66,15 +205,12 @@ class OneBot(commands.AutoShardedBot):
         await super().close()
 
 
-bot = OneBot()
-
 if __name__ == "__main__":
-    # Set logging levels
-    level = logging.DEBUG if config.get("debug") else logging.WARNING
-
-    logging.getLogger("httpx").setLevel(level)
-    loggers = [logging.getLogger(name) for name in logging.root.manager.loggerDict]
-    for logger in loggers:
-        logger.setLevel(level)
-
-    bot.run(config["token"], root_logger=True)
+    bot = OneBot()
+    listener = setup_logging()
+    runtime.install()
+    try:
+        # logging is already set up, so discord.py shouldn't add its own handler
+        bot.run(config["token"], log_handler=None)
+    finally:
+        listener.stop()
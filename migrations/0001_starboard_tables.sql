@@ -0,0 +1,17 @@
+-- Starboard tables, as previously created by the Starboard cog on load
+CREATE TABLE IF NOT EXISTS starboard (
+    guild_id BIGINT PRIMARY KEY,
+    channel_id BIGINT NOT NULL,
+    star_count INT DEFAULT 5
+);
+
+-- starred messages, to prevent duplicates
+CREATE TABLE IF NOT EXISTS starred_messages (
+    message_id BIGINT PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    author_id BIGINT NOT NULL,
+    starboard_message_id BIGINT,
+    starboard_message_url TEXT,
+    star_count INT DEFAULT 0
+);
@@ -0,0 +1,10 @@
+-- starboard channel lookups when a channel is deleted
+CREATE INDEX IF NOT EXISTS starboard_channel_id_idx ON starboard (channel_id);
+
+-- server statistics and the most starred message of a server
+CREATE INDEX IF NOT EXISTS starred_messages_guild_stars_idx
+    ON starred_messages (guild_id, star_count);
+
+-- user statistics and the most starred message of a user
+CREATE INDEX IF NOT EXISTS starred_messages_guild_author_stars_idx
+    ON starred_messages (guild_id, author_id, star_count);
@@ -0,0 +1,154 @@
+-- Per-guild and per-author starboard statistics, kept up to date by triggers on starred_messages.
+-- The top message is the one with the most stars, the oldest one winning ties.
+
+CREATE TABLE IF NOT EXISTS starboard_guild_stats (
+    guild_id BIGINT PRIMARY KEY,
+    total_starred INT NOT NULL DEFAULT 0,
+    total_stars BIGINT NOT NULL DEFAULT 0,
+    max_stars INT,
+    top_message_url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS starboard_author_stats (
+    guild_id BIGINT NOT NULL,
+    author_id BIGINT NOT NULL,
+    total_starred INT NOT NULL DEFAULT 0,
+    total_stars BIGINT NOT NULL DEFAULT 0,
+    max_stars INT,
+    top_message_url TEXT,
+    PRIMARY KEY (guild_id, author_id)
+);
+
+-- top message lookups, replacing the indexes from 0002
+CREATE INDEX IF NOT EXISTS starred_messages_guild_top_idx
+    ON starred_messages (guild_id, star_count DESC, message_id);
+CREATE INDEX IF NOT EXISTS starred_messages_guild_author_top_idx
+    ON starred_messages (guild_id, author_id, star_count DESC, message_id);
+DROP INDEX IF EXISTS starred_messages_guild_stars_idx;
+DROP INDEX IF EXISTS starred_messages_guild_author_stars_idx;
+
+-- Apply changes in message count and star count per (guild, author), then refresh the top messages
+CREATE OR REPLACE FUNCTION starboard_stats_apply(
+    guild_ids BIGINT[], author_ids BIGINT[], messages INT[], stars BIGINT[]
+) RETURNS VOID AS $$
+BEGIN
+    IF guild_ids IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO starboard_guild_stats AS s (guild_id, total_starred, total_stars)
+    SELECT d.guild_id, SUM(d.messages), SUM(d.stars)
+    FROM unnest(guild_ids, messages, stars) AS d(guild_id, messages, stars)
+    GROUP BY d.guild_id
+    ON CONFLICT (guild_id) DO UPDATE
+    SET total_starred = s.total_starred + EXCLUDED.total_starred,
+        total_stars = s.total_stars + EXCLUDED.total_stars;
+
+    INSERT INTO starboard_author_stats AS s (guild_id, author_id, total_starred, total_stars)
+    SELECT d.guild_id, d.author_id, SUM(d.messages), SUM(d.stars)
+    FROM unnest(guild_ids, author_ids, messages, stars) AS d(guild_id, author_id, messages, stars)
+    GROUP BY d.guild_id, d.author_id
+    ON CONFLICT (guild_id, author_id) DO UPDATE
+    SET total_starred = s.total_starred + EXCLUDED.total_starred,
+        total_stars = s.total_stars + EXCLUDED.total_stars;
+
+    DELETE FROM starboard_guild_stats
+    WHERE guild_id = ANY(guild_ids) AND total_starred <= 0;
+    DELETE FROM starboard_author_stats
+    WHERE (guild_id, author_id) IN (SELECT * FROM unnest(guild_ids, author_ids))
+        AND total_starred <= 0;
+
+    UPDATE starboard_guild_stats AS s
+    SET max_stars = top.star_count, top_message_url = top.starboard_message_url
+    FROM (SELECT DISTINCT unnest(guild_ids) AS guild_id) AS g
+    CROSS JOIN LATERAL (
+        SELECT m.star_count, m.starboard_message_url
+        FROM starred_messages AS m
+        WHERE m.guild_id = g.guild_id
+        ORDER BY m.star_count DESC, m.message_id
+        LIMIT 1
+    ) AS top
+    WHERE s.guild_id = g.guild_id;
+
+    UPDATE starboard_author_stats AS s
+    SET max_stars = top.star_count, top_message_url = top.starboard_message_url
+    FROM (SELECT DISTINCT * FROM unnest(guild_ids, author_ids)) AS a(guild_id, author_id)
+    CROSS JOIN LATERAL (
+        SELECT m.star_count, m.starboard_message_url
+        FROM starred_messages AS m
+        WHERE m.guild_id = a.guild_id AND m.author_id = a.author_id
+        ORDER BY m.star_count DESC, m.message_id
+        LIMIT 1
+    ) AS top
+    WHERE s.guild_id = a.guild_id AND s.author_id = a.author_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION starred_messages_stats_insert() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM starboard_stats_apply(
+        array_agg(guild_id),
+        array_agg(author_id),
+        array_agg(1),
+        array_agg(COALESCE(star_count, 0)::BIGINT)
+    )
+    FROM new_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION starred_messages_stats_update() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM starboard_stats_apply(
+        array_agg(d.guild_id),
+        array_agg(d.author_id),
+        array_agg(d.messages),
+        array_agg(d.stars)
+    )
+    FROM (
+        SELECT guild_id, author_id, -1 AS messages, -COALESCE(star_count, 0)::BIGINT AS stars
+        FROM old_rows
+        UNION ALL
+        SELECT guild_id, author_id, 1, COALESCE(star_count, 0)::BIGINT
+        FROM new_rows
+    ) AS d;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION starred_messages_stats_delete() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM starboard_stats_apply(
+        array_agg(guild_id),
+        array_agg(author_id),
+        array_agg(-1),
+        array_agg(-COALESCE(star_count, 0)::BIGINT)
+    )
+    FROM old_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER starred_messages_stats_insert
+    AFTER INSERT ON starred_messages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION starred_messages_stats_insert();
+
+CREATE TRIGGER starred_messages_stats_update
+    AFTER UPDATE ON starred_messages
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION starred_messages_stats_update();
+
+CREATE TRIGGER starred_messages_stats_delete
+    AFTER DELETE ON starred_messages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION starred_messages_stats_delete();
+
+-- statistics for existing starred messages
+SELECT starboard_stats_apply(
+    array_agg(guild_id),
+    array_agg(author_id),
+    array_agg(1),
+    array_agg(COALESCE(star_count, 0)::BIGINT)
+)
+FROM starred_messages;
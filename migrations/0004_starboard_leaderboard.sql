@@ -0,0 +1,3 @@
+-- keyset pagination of the authors leaderboard
+CREATE INDEX IF NOT EXISTS starboard_author_stats_leaderboard_idx
+    ON starboard_author_stats (guild_id, total_stars DESC, author_id);
@@ -0,0 +1,2 @@
+-- the caption message sent after a forwarded starboard post, edited to show the live star count
+ALTER TABLE starred_messages ADD COLUMN IF NOT EXISTS starboard_caption_id BIGINT;
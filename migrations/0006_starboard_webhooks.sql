@@ -0,0 +1,5 @@
+-- optional posting through a webhook in the starboard channel, created once and reused
+ALTER TABLE starboard
+    ADD COLUMN IF NOT EXISTS use_webhook BOOLEAN NOT NULL DEFAULT FALSE,
+    ADD COLUMN IF NOT EXISTS webhook_id BIGINT,
+    ADD COLUMN IF NOT EXISTS webhook_token TEXT;
@@ -0,0 +1,8 @@
+-- progress of starboard backfills, so an interrupted scan resumes where it stopped
+CREATE TABLE IF NOT EXISTS starboard_backfill (
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    last_message_id BIGINT NOT NULL,
+    done BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (guild_id, channel_id)
+);
@@ -0,0 +1,153 @@
+"""Communication between the bot processes started by launcher.py.
+
+Each cluster is connected to the launcher by a pipe. A request sent by one cluster is forwarded
+by the launcher to every cluster, including the one that sent it. The launcher passes each
+cluster's reply back to the requester as it arrives, and tells it once every cluster has replied.
+
+Messages are tuples:
+- cluster -> launcher: ("request", request_id, name, args) and ("reply", token, ok, value)
+- launcher -> cluster: ("call", token, name, args), ("result", request_id, cluster_id, ok, value)
+  and ("done", request_id)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import threading
+from collections.abc import Awaitable, Callable
+from multiprocessing.connection import Connection
+from typing import Any
+
+Handler = Callable[..., Awaitable[Any]]
+# cluster_id: whether the handler succeeded, and its result or error
+Replies = dict[int, tuple[bool, Any]]
+
+
+class LocalCluster:
+    """Used when the bot runs as a single process, so requests don't need special-casing."""
+
+    id = 0
+    count = 1
+
+    def __init__(self):
+        # name: handler
+        self.handlers: dict[str, Handler] = {}
+
+    def register(self, name: str, handler: Handler) -> None:
+        """Handle requests with a name, replacing any existing handler.
+
+        :param name: The request name.
+        :type name: str
+        :param handler: Called with the request's arguments, its result is sent to the requester.
+        :type handler: Callable[..., Awaitable[Any]]"""
+
+        self.handlers[name] = handler
+
+    def start(self) -> None:
+        pass
+
+    async def request(self, name: str, *args, timeout: float = 10.0) -> dict[int, Any]:
+        """Run a request's handler on every cluster.
+
+        :return: Each cluster's result, by cluster ID. Clusters whose handler failed are left out.
+        :rtype: dict[int, Any]"""
+
+        try:
+            return {self.id: await self.handlers[name](*args)}
+        except Exception:
+            logging.exception(f"Cluster request {name} failed")
+            return {}
+
+
+class ClusterClient(LocalCluster):
+    """A cluster's connection to the launcher.
+
+    :param cluster_id: This cluster's ID.
+    :type cluster_id: int
+    :param count: The total number of clusters.
+    :type count: int
+    :param conn: This cluster's end of its pipe to the launcher.
+    :type conn: multiprocessing.connection.Connection"""
+
+    def __init__(self, cluster_id: int, count: int, conn: Connection):
+        super().__init__()
+        self.id = cluster_id
+        self.count = count
+        self.conn = conn
+        self._ids = itertools.count()
+        # request_id: future set when every cluster has replied, and the replies so far
+        self._pending: dict[int, tuple[asyncio.Future, Replies]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self) -> None:
+        """Start receiving messages from the launcher. Must be called from the bot's event loop."""
+
+        self._loop = asyncio.get_running_loop()
+        # pipes can't be awaited portably, so they're read in a thread
+        threading.Thread(target=self._receive, name="cluster-ipc", daemon=True).start()
+
+    async def request(self, name: str, *args, timeout: float = 10.0) -> dict[int, Any]:
+        """Run a request's handler on every cluster.
+
+        :return: Each cluster's result, by cluster ID. Clusters whose handler failed, or that
+            didn't reply within the timeout, are left out.
+        :rtype: dict[int, Any]"""
+
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        results: Replies = {}
+        self._pending[request_id] = (future, results)
+        self.conn.send(("request", request_id, name, args))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logging.warning(
+                f"Cluster request {name} timed out, only clusters {sorted(results)} replied"
+            )
+        finally:
+            self._pending.pop(request_id, None)
+
+        values = {}
+        for cluster_id, (ok, value) in results.items():
+            if ok:
+                values[cluster_id] = value
+            else:
+                logging.error(
+                    f"Cluster request {name} failed on cluster {cluster_id}: {value}"
+                )
+        return values
+
+    def _receive(self) -> None:
+        while True:
+            try:
+                message = self.conn.recv()
+            except EOFError:
+                logging.error("Lost connection to the launcher.")
+                return
+            self._loop.call_soon_threadsafe(self._dispatch, message)
+
+    def _dispatch(self, message: tuple) -> None:
+        op, *data = message
+        if op == "call":
+            asyncio.create_task(self._call(*data))
+        elif op == "result":
+            request_id, cluster_id, ok, value = data
+            if request_id in self._pending:
+                _, results = self._pending[request_id]
+                results[cluster_id] = (ok, value)
+        elif op == "done":
+            (request_id,) = data
+            if request_id in self._pending:
+                future, _ = self._pending[request_id]
+                if not future.done():
+                    future.set_result(None)
+
+    async def _call(self, token: tuple[int, int], name: str, args: tuple) -> None:
+        try:
+            reply = (True, await self.handlers[name](*args))
+        except Exception as e:
+            logging.exception(f"Cluster request {name} failed")
+            reply = (False, repr(e))
+        self.conn.send(("reply", token, *reply))
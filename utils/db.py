@@ -0,0 +1,118 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from textwrap import dedent
+from time import perf_counter
+
+import asyncpg
+
+from utils.metrics import Counter, Gauge, Histogram
+from utils.timing import add_db
+
+QUERY_SECONDS = Histogram(
+    "db_query_seconds", "Time taken by database queries", ("statement",)
+)
+QUERY_ERRORS = Counter(
+    "db_query_errors_total", "Database queries that raised an error", ("statement",)
+)
+
+POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Connections in the database pool", ("state",)
+)
+ACQUIRE_SECONDS = Histogram(
+    "db_pool_acquire_seconds", "Time spent waiting for a pool connection"
+)
+QUERIES_IN_FLIGHT = Gauge("db_queries_in_flight", "Queries currently running")
+
+# name: query, for every declared statement
+QUERIES: dict[str, "Query"] = {}
+
+
+def watch_pool(pool: asyncpg.Pool) -> None:
+    """Report a pool's connection counts in the db_pool_connections metric."""
+
+    def connections() -> dict[tuple[str], int]:
+        idle = pool.get_idle_size()
+        return {
+            ("acquired",): pool.get_size() - idle,
+            ("idle",): idle,
+            ("max",): pool.get_max_size(),
+        }
+
+    POOL_CONNECTIONS.set_function(connections)
+
+
+@asynccontextmanager
+async def acquire(pool: asyncpg.Pool) -> AsyncIterator[asyncpg.Connection]:
+    """Acquire a connection from a pool, recording how long it took."""
+
+    start = perf_counter()
+    async with pool.acquire() as conn:
+        elapsed = perf_counter() - start
+        ACQUIRE_SECONDS.observe(elapsed)
+        add_db(elapsed)
+        yield conn
+
+
+class Query:
+    """A named SQL statement, declared once and run with per-statement timing.
+
+    asyncpg prepares statements per connection and caches them by their exact text, so
+    declaring each statement once means every call reuses the same prepared statement
+    instead of parsing and planning slightly different copies of it.
+
+    :param name: A short unique name for the statement, used in metrics.
+    :type name: str
+    :param sql: The statement. Indentation and surrounding whitespace are removed.
+    :type sql: str"""
+
+    def __init__(self, name: str, sql: str):
+        if name in QUERIES and QUERIES[name].sql != dedent(sql).strip():
+            raise ValueError(f"A different query named {name} already exists.")
+
+        self.name = name
+        self.sql = dedent(sql).strip()
+        QUERIES[name] = self
+
+    def __repr__(self) -> str:
+        return f"<Query {self.name}>"
+
+    async def _run(
+        self, method: str, executor: asyncpg.Pool | asyncpg.Connection, *args
+    ):
+        if isinstance(executor, asyncpg.Pool):
+            async with acquire(executor) as conn:
+                return await self._run(method, conn, *args)
+
+        QUERIES_IN_FLIGHT.inc()
+        start = perf_counter()
+        try:
+            return await getattr(executor, method)(self.sql, *args)
+        except Exception:
+            QUERY_ERRORS.inc(statement=self.name)
+            raise
+        finally:
+            elapsed = perf_counter() - start
+            QUERY_SECONDS.observe(elapsed, statement=self.name)
+            QUERIES_IN_FLIGHT.dec()
+            add_db(elapsed)
+
+    async def execute(self, executor: asyncpg.Pool | asyncpg.Connection, *args) -> str:
+        return await self._run("execute", executor, *args)
+
+    async def executemany(
+        self, executor: asyncpg.Pool | asyncpg.Connection, args: list
+    ) -> None:
+        return await self._run("executemany", executor, args)
+
+    async def fetch(
+        self, executor: asyncpg.Pool | asyncpg.Connection, *args
+    ) -> list[asyncpg.Record]:
+        return await self._run("fetch", executor, *args)
+
+    async def fetchrow(
+        self, executor: asyncpg.Pool | asyncpg.Connection, *args
+    ) -> asyncpg.Record | None:
+        return await self._run("fetchrow", executor, *args)
+
+    async def fetchval(self, executor: asyncpg.Pool | asyncpg.Connection, *args):
+        return await self._run("fetchval", executor, *args)
@@ -0,0 +1,15 @@
+"""Gauges describing the bot process, set up by OneBot.setup_hook.
+
+They're defined here rather than in main.py, as cogs that import main at runtime run it a second
+time as the module `main`, which would replace them."""
+
+from utils.metrics import Gauge
+
+STARTUP_SECONDS = Gauge(
+    "startup_seconds", "Time taken by each step of starting up", ("step",)
+)
+GATEWAY_LATENCY = Gauge(
+    "gateway_latency_seconds", "Heartbeat latency of each shard", ("shard",)
+)
+GUILDS = Gauge("guilds", "Guilds the bot is in, in this cluster")
+VIEWS = Gauge("active_views", "Views that are listening for interactions")
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from time import perf_counter
+from types import SimpleNamespace
+
+import aiohttp
+from yarl import URL
+
+from utils import runtime
+from utils.metrics import Counter, Histogram
+from utils.timing import add_http
+
+REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "Time taken by outbound HTTP requests", ("host",)
+)
+RESPONSES = Counter(
+    "http_responses_total",
+    "Outbound HTTP responses by host and status, or error if there was none",
+    ("host", "status"),
+)
+
+DEFAULTS = {
+    # connections across all hosts, and to each host
+    "limit": 100,
+    "limit_per_host": 10,
+    # seconds to keep idle connections open for reuse
+    "keepalive_timeout": 30.0,
+    # seconds to cache DNS lookups for
+    "ttl_dns_cache": 300,
+    # seconds to open a connection, not counting waits for a free one in the pool
+    "connect_timeout": 5.0,
+    # seconds to wait for each read from the socket
+    "read_timeout": 15.0,
+}
+
+
+async def _on_request_start(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceRequestStartParams,
+) -> None:
+    ctx.start = perf_counter()
+
+
+async def _on_request_end(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceRequestEndParams,
+) -> None:
+    host = params.url.host
+    elapsed = perf_counter() - ctx.start
+    REQUEST_SECONDS.observe(elapsed, host=host)
+    RESPONSES.inc(host=host, status=str(params.response.status))
+    add_http(elapsed)
+
+
+async def _on_request_exception(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceRequestExceptionParams,
+) -> None:
+    host = params.url.host
+    elapsed = perf_counter() - ctx.start
+    REQUEST_SECONDS.observe(elapsed, host=host)
+    RESPONSES.inc(host=host, status="error")
+    add_http(elapsed)
+
+
+def trace_config() -> aiohttp.TraceConfig:
+    """A trace config that records the latency and status of requests by host."""
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(_on_request_start)
+    trace.on_request_end.append(_on_request_end)
+    trace.on_request_exception.append(_on_request_exception)
+    return trace
+
+
+class FastJSONResponse(aiohttp.ClientResponse):
+    """Response that decodes JSON with orjson by default."""
+
+    async def json(self, *, loads=None, **kwargs):
+        return await super().json(loads=loads or runtime.orjson.loads, **kwargs)
+
+
+def create_session(settings: dict) -> aiohttp.ClientSession:
+    """Create a session with its own connector, using DEFAULTS for settings that aren't given."""
+
+    settings = DEFAULTS | settings
+    connector = aiohttp.TCPConnector(
+        limit=settings["limit"],
+        limit_per_host=settings["limit_per_host"],
+        keepalive_timeout=settings["keepalive_timeout"],
+        ttl_dns_cache=settings["ttl_dns_cache"],
+    )
+    timeout = aiohttp.ClientTimeout(
+        sock_connect=settings["connect_timeout"], sock_read=settings["read_timeout"]
+    )
+    kwargs = {}
+    if runtime.fast_json():
+        kwargs["response_class"] = FastJSONResponse
+        kwargs["json_serialize"] = lambda obj: runtime.orjson.dumps(obj).decode()
+    return aiohttp.ClientSession(
+        connector=connector, timeout=timeout, trace_configs=[trace_config()], **kwargs
+    )
+
+
+class HTTPClient:
+    """Routes outbound requests to a session by host.
+
+    Hosts with their own settings get their own session and connector. All other hosts share one.
+    Requests are made the same way as with an aiohttp.ClientSession.
+
+    :param settings: Connector and timeout settings (see DEFAULTS), with per-host overrides in "hosts".
+    :type settings: dict"""
+
+    def __init__(self, settings: dict | None = None):
+        settings = dict(settings or {})
+        hosts = settings.pop("hosts", {})
+        self.default = create_session(settings)
+        # host: session
+        self.sessions = {
+            host: create_session(settings | overrides)
+            for host, overrides in hosts.items()
+        }
+
+    def session_for(self, url: str | URL) -> aiohttp.ClientSession:
+        return self.sessions.get(URL(url).host, self.default)
+
+    def request(self, method: str, url: str | URL, **kwargs):
+        return self.session_for(url).request(method, url, **kwargs)
+
+    def get(self, url: str | URL, **kwargs):
+        return self.session_for(url).get(url, **kwargs)
+
+    def post(self, url: str | URL, **kwargs):
+        return self.session_for(url).post(url, **kwargs)
+
+    async def close(self) -> None:
+        await self.default.close()
+        for session in self.sessions.values():
+            await session.close()
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import suppress
+from dataclasses import dataclass
+from statistics import quantiles
+
+from utils.metrics import Counter, Histogram
+
+LAG_SECONDS = Histogram(
+    "loop_lag_seconds",
+    "How late the event loop woke up from a sleep",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+BLOCKS = Counter(
+    "loop_blocks_total", "Times the event loop was blocked past the threshold"
+)
+
+
+@dataclass(slots=True)
+class Block:
+    """A time the event loop was blocked, and what it was running."""
+
+    started_at: float
+    seconds: float
+    name: str
+    stack: str
+
+
+class LagMonitor:
+    """Measure event loop lag, and find out what is running when the loop is blocked.
+
+    A task sleeps for `interval` seconds at a time and records how late it wakes up. Separately,
+    a heartbeat task runs every quarter of `threshold`, so that a watchdog thread can notice
+    when the loop hasn't run it for `threshold` seconds, which means the loop is stuck on a
+    callback, and capture the loop thread's stack while it still is. Blocks that end before the
+    watchdog looks are still recorded by the heartbeat, without a stack.
+
+    :param interval: Seconds between lag samples, defaults to 0.5.
+    :type interval: float
+    :param threshold: Seconds the loop has to be blocked for to be reported, defaults to 0.25.
+    :type threshold: float
+    :param window: Number of recent samples to compute percentiles from, defaults to 600.
+    :type window: int"""
+
+    def __init__(
+        self, interval: float = 0.5, threshold: float = 0.25, window: int = 600
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples: deque[float] = deque(maxlen=window)
+        self.blocks: deque[Block] = deque(maxlen=20)
+        self._tasks: list[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread_id: int | None = None
+        self._beat = time.monotonic()
+        self._stopped = threading.Event()
+        # held while checking for and recording a block, as both threads do
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start monitoring the running event loop."""
+
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._tasks = [
+            asyncio.create_task(self._sample()),
+            asyncio.create_task(self._heartbeat()),
+        ]
+        watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        for task in self._tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def percentiles(self) -> dict[str, float]:
+        """Get the p50, p95, p99 and max of the recent lag samples, in seconds."""
+
+        if len(self.samples) < 2:
+            return {}
+        cuts = quantiles(self.samples, n=100, method="inclusive")
+        return {
+            "p50": cuts[49],
+            "p95": cuts[94],
+            "p99": cuts[98],
+            "max": max(self.samples),
+        }
+
+    async def _sample(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - start - self.interval, 0)
+            self.samples.append(lag)
+            LAG_SECONDS.observe(lag)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.threshold / 4)
+            now = time.monotonic()
+            stalled = now - self._beat
+            if stalled >= self.threshold:
+                with self._lock:
+                    if self.blocks and self.blocks[-1].started_at == self._beat:
+                        # the watchdog only saw how long the block had lasted so far
+                        block = self.blocks[-1]
+                        block.seconds = stalled
+                        logging.warning(
+                            f"Event loop was blocked for {stalled:.3f} s by {block.name}"
+                        )
+                    else:
+                        self.blocks.append(Block(self._beat, stalled, "unknown", ""))
+                        BLOCKS.inc()
+                        logging.warning(
+                            f"Event loop was blocked for {stalled:.3f} s, "
+                            "but it ended before the watchdog could see by what"
+                        )
+            self._beat = now
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.threshold / 4):
+            with self._lock:
+                beat = self._beat
+                stalled = time.monotonic() - beat
+                if stalled < self.threshold or (
+                    self.blocks and self.blocks[-1].started_at == beat
+                ):
+                    continue
+
+                name, stack = self._running()
+                self.blocks.append(Block(beat, stalled, name, stack))
+            BLOCKS.inc()
+            logging.warning(
+                f"Event loop blocked for over {stalled:.3f} s by {name}:\n{stack}"
+            )
+
+    def _running(self) -> tuple[str, str]:
+        """Describe what the event loop thread is running right now."""
+
+        frame = sys._current_frames().get(self._thread_id)
+        if frame is None:
+            return "unknown", ""
+        stack = "".join(traceback.format_stack(frame, limit=15))
+
+        # the task being run, if any, names the coroutine better than the innermost frame
+        task = asyncio.current_task(self._loop)
+        if task is not None:
+            coro = task.get_coro()
+            name = getattr(coro, "__qualname__", repr(coro))
+            return f"task {task.get_name()} ({name})", stack
+
+        summary = traceback.extract_stack(frame, limit=1)[-1]
+        return f"{summary.name} ({summary.filename}:{summary.lineno})", stack
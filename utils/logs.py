@@ -0,0 +1,86 @@
+"""Logging setup. Records are put on a queue by the thread that logs them, and formatted and
+written by a background thread, so logging never blocks the event loop on I/O."""
+
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import queue
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+
+from config import config
+
+# loggers of the libraries we use, set to the library log level unless configured otherwise
+LIBRARY_LOGGERS = ("discord", "jishaku", "aiohttp", "asyncpg", "httpx", "httpcore")
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ThreadQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener.
+
+    The default handler formats each record before queueing it, which would keep formatting on
+    the logging thread. Only the message's arguments are resolved here, as they might change
+    after the call."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging() -> QueueListener:
+    """Route all logging through a queue to a background thread that writes to stderr.
+
+    Levels come from the debug setting, and the log_levels setting overrides them per logger.
+
+    :return: The started listener. Stop it on exit to write out the remaining records.
+    :rtype: QueueListener"""
+
+    debug = config.get("debug")
+    levels = {"root": logging.DEBUG if debug else logging.INFO}
+    for name in LIBRARY_LOGGERS:
+        levels[name] = logging.DEBUG if debug else logging.WARNING
+    levels |= config.get("log_levels", {})
+
+    # setting levels on parent loggers is enough, child loggers inherit them
+    for name, level in levels.items():
+        logger = logging.getLogger() if name == "root" else logging.getLogger(name)
+        logger.setLevel(level)
+
+    handler = logging.StreamHandler()
+    if config.get("log_json"):
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(
+            logging.Formatter(
+                "[{asctime}] [{levelname:<8}] {name}: {message}",
+                "%Y-%m-%d %H:%M:%S",
+                style="{",
+            )
+        )
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [ThreadQueueHandler(log_queue)]
+
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
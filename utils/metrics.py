@@ -0,0 +1,228 @@
+"""Minimal in-process metrics in the style of prometheus_client.
+
+Metrics register themselves in `REGISTRY` when created and keep their values across cog reloads.
+`render` formats every metric in the Prometheus text exposition format, and `serve` serves it
+over HTTP for Prometheus to scrape."""
+
+from bisect import bisect_left
+from collections.abc import Callable
+from math import inf, isnan
+
+from aiohttp import web
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REGISTRY: dict[str, "Metric"] = {}
+
+
+class Metric:
+    """Base class for metrics. Values are stored per tuple of label values.
+
+    :param name: The metric's name.
+    :type name: str
+    :param documentation: A short description of the metric.
+    :type documentation: str
+    :param labelnames: The names of the metric's labels, if any.
+    :type labelnames: tuple[str, ...]"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+        # reuse the values of a metric with the same name (e.g. when a cog is reloaded)
+        existing = REGISTRY.get(name)
+        if existing is not None and existing.kind == self.kind:
+            self._values = existing._values
+        else:
+            self._values = {}
+        REGISTRY[name] = self
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def label_values(self) -> list[tuple[str, ...]]:
+        """Get every combination of label values that has been recorded."""
+
+        return list(self._values)
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        """Get the metric's current samples as (name, label values, value) tuples."""
+
+        return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        existing = REGISTRY.get(name)
+        super().__init__(name, documentation, labelnames)
+        # keep the function of a gauge with the same name, like its values
+        self._function: Callable[[], float | dict] | None = (
+            existing._function if isinstance(existing, Gauge) else None
+        )
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def set_function(
+        self, function: Callable[[], float | dict[tuple[str, ...], float]]
+    ) -> None:
+        """Compute the gauge's value when it is read.
+
+        :param function: Returns the value, or a dict of label values to values for labelled gauges.
+        :type function: Callable"""
+
+        self._function = function
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        if self._function is None:
+            return super().samples()
+
+        value = self._function()
+        if isinstance(value, dict):
+            return [(self.name, key, v) for key, v in value.items()]
+        return [(self.name, (), value)]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # [per-bucket counts, sum, count]
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def sum(self, **labels) -> float:
+        state = self._values.get(self._key(labels))
+        return state[1] if state else 0.0
+
+    def quantile(self, q: float, **labels) -> float | None:
+        """Estimate a quantile from the bucket counts, interpolating linearly inside the bucket.
+
+        :return: The estimate, or None if nothing has been observed.
+        :rtype: Optional[float]"""
+
+        state = self._values.get(self._key(labels))
+        if not state or not state[2]:
+            return None
+
+        rank = q * state[2]
+        seen = 0
+        for i, bucket_count in enumerate(state[0]):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i else 0
+                upper = self.buckets[i]
+                if upper == inf:
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-2]
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        samples = []
+        for key, (bucket_counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == inf else f"{bound:g}"
+                samples.append((f"{self.name}_bucket", key + (le,), cumulative))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, count))
+        return samples
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not values:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isnan(value):
+        return "NaN"
+    if value in (inf, -inf):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(prefix: str = "") -> str:
+    """Render all metrics whose names start with `prefix` in the Prometheus text format."""
+
+    lines = []
+    for name, metric in sorted(REGISTRY.items()):
+        if not name.startswith(prefix):
+            continue
+
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for sample_name, values, value in metric.samples():
+            names = metric.labelnames
+            if sample_name.endswith("_bucket"):
+                names += ("le",)
+            lines.append(
+                f"{sample_name}{_format_labels(names, values)} {_format_value(value)}"
+            )
+
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+async def serve(host: str, port: int) -> web.AppRunner:
+    """Serve all metrics at /metrics.
+
+    :return: The server's runner, clean it up to stop the server.
+    :rtype: aiohttp.web.AppRunner"""
+
+    async def metrics(_: web.Request) -> web.Response:
+        return web.Response(
+            body=render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,75 @@
+import logging
+import re
+from pathlib import Path
+
+import asyncpg
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / "migrations"
+# arbitrary key for the advisory lock, so only one process migrates at a time
+LOCK_KEY = 0x1B07
+
+
+def get_migrations() -> list[tuple[int, str, Path]]:
+    """Get all migration files in order.
+
+    Migration files are named `<version>_<name>.sql`, e.g. `0001_starboard_tables.sql`.
+
+    :return: A list of (version, name, path) tuples, sorted by version.
+    :rtype: list[tuple[int, str, Path]]"""
+
+    migrations = []
+    for path in MIGRATIONS_DIR.glob("*.sql"):
+        match = re.fullmatch(r"(\d+)_(\w+)\.sql", path.name)
+        if not match:
+            raise RuntimeError(f"Invalid migration file name: {path.name}")
+        migrations.append((int(match[1]), match[2], path))
+
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration versions found.")
+    return migrations
+
+
+async def migrate(pool: asyncpg.Pool) -> list[str]:
+    """Apply pending migrations, each in its own transaction.
+
+    :param pool: The pool to get a connection from.
+    :type pool: asyncpg.Pool
+    :return: The names of the migrations that were applied.
+    :rtype: list[str]"""
+
+    applied = []
+    async with pool.acquire() as conn:
+        await conn.execute("SELECT pg_advisory_lock($1)", LOCK_KEY)
+        try:
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                """
+            )
+            current = await conn.fetchval(
+                "SELECT COALESCE(MAX(version), 0) FROM schema_migrations"
+            )
+
+            for version, name, path in get_migrations():
+                if version <= current:
+                    continue
+
+                async with conn.transaction():
+                    await conn.execute(path.read_text(encoding="utf-8"))
+                    await conn.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                        version,
+                        name,
+                    )
+                logging.info(f"Applied migration {version:04}_{name}")
+                applied.append(name)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", LOCK_KEY)
+
+    return applied
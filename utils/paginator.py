@@ -1,3 +1,5 @@
+from collections.abc import Awaitable, Callable
+
 import discord
 from discord import Interaction
 from discord.ui import Button, View
@@ -43,8 +45,15 @@ class Paginator(View):
             return False
         return True
 
+    async def get_page(self, index: int) -> discord.Embed:
+        """Get the embed for a page.
+
+        :param index: The zero-based page number.
+        :type index: int"""
+        return self.pages[index]
+
     async def start(self) -> None:
-        embed = self.pages[0]
+        embed = await self.get_page(0)
         try:
             await self.interaction.response.send_message(
                 self.message_content, embed=embed, view=self
@@ -88,7 +97,7 @@ class Paginator(View):
         self.stop()
 
     async def update_page(self, i: Interaction | None = None) -> None:
-        embed = self.pages[self.current_page]
+        embed = await self.get_page(self.current_page)
         self.update_jump_button()
 
         if i:
@@ -97,6 +106,50 @@ class Paginator(View):
             await self.message.edit(embed=embed, view=self)
 
 
+class LazyPaginator(Paginator):
+    def __init__(
+        self,
+        *,
+        interaction: Interaction,
+        get_page: Callable[[int], Awaitable[discord.Embed]],
+        total_pages: int,
+        timeout: int = 60,
+        message_content: str | None = None,
+    ):
+        """Paginator that builds each page when it is shown instead of upfront.
+
+        :param interaction: The interaction to respond to.
+        :type interaction: discord.Interaction
+        :param get_page: Coroutine function returning the embed for a zero-based page number.
+        :type get_page: Callable[[int], Awaitable[discord.Embed]]
+        :param total_pages: The number of pages.
+        :type total_pages: int
+        :param timeout: Timeout for the paginator view, defaults to 60 seconds.
+        :type timeout: Optional[int]
+        :param message_content: Message to send with the embeds.
+        :type message_content: Optional[str]
+        """
+
+        self._get_page = get_page
+        super().__init__(
+            interaction=interaction,
+            pages=[],
+            timeout=timeout,
+            message_content=message_content,
+        )
+        self.total_pages = total_pages
+        self.update_jump_button()
+
+    async def get_page(self, index: int) -> discord.Embed:
+        return await self._get_page(index)
+
+    async def update_page(self, i: Interaction | None = None) -> None:
+        # building a page can take several queries, so respond to the button first
+        if i:
+            await i.response.defer()
+        await super().update_page()
+
+
 class PageSelectModal(discord.ui.Modal, title="Jump to Page"):
     page_number = discord.ui.TextInput(
         label="Page Number", placeholder="Enter page number", min_length=1, max_length=5
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from collections import Counter
+from types import CodeType
+
+
+def _describe(code: CodeType) -> str:
+    path = os.path.relpath(code.co_filename)
+    # keep paths of installed packages short
+    if "site-packages" in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    return f"{code.co_qualname} ({path})"
+
+
+class SamplingProfiler:
+    """Sample a thread's stack at an interval from a background thread.
+
+    The profiled thread isn't slowed down by tracing, so this is cheap enough to run on a busy
+    production process. Stacks are counted in the collapsed format used by flamegraph.pl and
+    speedscope.
+
+    :param thread_id: The thread to sample, usually the event loop's.
+    :type thread_id: int
+    :param interval: Seconds between samples, defaults to 0.005.
+    :type interval: float"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        # code object: its description, as working out paths for every frame is slow
+        self._descriptions: dict[CodeType, str] = {}
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """The sampled stacks, one per line, as semicolon-separated frames and a count."""
+
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                description = self._descriptions.get(code)
+                if description is None:
+                    description = self._descriptions[code] = _describe(code)
+                frames.append(description)
+                frame = frame.f_back
+            self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
@@ -0,0 +1,46 @@
+"""Faster event loop and JSON implementations, used if the fast_runtime setting is on and they're installed."""
+
+import asyncio
+
+import discord
+
+from config import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+def fast_json() -> bool:
+    """Whether outbound HTTP responses should be decoded with orjson."""
+
+    return bool(config.get("fast_runtime")) and orjson is not None
+
+
+def install() -> None:
+    """Use uvloop for event loops created after this, if enabled. Call before bot.run."""
+
+    if config.get("fast_runtime") and uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+def describe() -> str:
+    """Describe which fast paths are active, for the startup log."""
+
+    if not config.get("fast_runtime"):
+        return "Fast runtime is off."
+
+    loop = type(asyncio.get_running_loop())
+    paths = [
+        "uvloop" if loop.__module__.startswith("uvloop") else "uvloop unavailable",
+        "orjson for HTTP" if orjson is not None else "orjson unavailable",
+        # discord.py uses orjson for gateway and API payloads by itself when it's installed
+        "orjson for discord.py" if discord.utils.HAS_ORJSON else "json for discord.py",
+    ]
+    return "Fast runtime: " + ", ".join(paths) + "."
@@ -0,0 +1,36 @@
+"""Timing of the application command being handled in the current task.
+
+The timing is stored in a context variable when a command starts, so the HTTP and database
+layers can add the time they spend to it without being passed the interaction. Tasks created
+by the command inherit it."""
+
+from __future__ import annotations
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+
+
+@dataclass(slots=True)
+class CommandTiming:
+    started_at: float = field(default_factory=perf_counter)
+    # seconds until the interaction was first responded to (sent or deferred)
+    first_response: float | None = None
+    # seconds spent in outbound HTTP requests and database queries
+    http: float = 0.0
+    db: float = 0.0
+
+
+current_timing: ContextVar[CommandTiming | None] = ContextVar(
+    "current_timing", default=None
+)
+
+
+def add_http(seconds: float) -> None:
+    if timing := current_timing.get():
+        timing.http += seconds
+
+
+def add_db(seconds: float) -> None:
+    if timing := current_timing.get():
+        timing.db += seconds
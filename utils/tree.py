@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from time import perf_counter
+from types import SimpleNamespace
+
+import aiohttp
+import discord
+from discord import app_commands
+
+from utils.metrics import Counter, Histogram
+from utils.timing import CommandTiming, current_timing
+
+COMMANDS = Counter(
+    "app_commands_total",
+    "Application command invocations by command and outcome",
+    ("command", "status"),
+)
+COMMAND_SECONDS = Histogram(
+    "app_command_seconds", "Time taken by application commands", ("command",)
+)
+# interactions have to be responded to within 3 seconds
+FIRST_RESPONSE_SECONDS = Histogram(
+    "app_command_first_response_seconds",
+    "Time until an application command first responded or deferred",
+    ("command",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 1.5, 2, 2.5, 3, 5, 10),
+)
+COMMAND_HTTP_SECONDS = Histogram(
+    "app_command_http_seconds",
+    "Time application commands spent in outbound HTTP requests",
+    ("command",),
+)
+COMMAND_DB_SECONDS = Histogram(
+    "app_command_db_seconds",
+    "Time application commands spent in database queries",
+    ("command",),
+)
+
+
+class InstrumentedTree(app_commands.CommandTree):
+    """Command tree that starts timing each interaction, for command metrics."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        timing = interaction.extras["timing"] = CommandTiming()
+        current_timing.set(timing)
+        return True
+
+
+async def _on_request_end(
+    session: aiohttp.ClientSession,
+    ctx: SimpleNamespace,
+    params: aiohttp.TraceRequestEndParams,
+) -> None:
+    # interaction responses, including defers, are posted to the interaction's callback URL
+    timing = current_timing.get()
+    if (
+        timing is not None
+        and timing.first_response is None
+        and params.url.path.endswith("/callback")
+    ):
+        timing.first_response = perf_counter() - timing.started_at
+
+
+def discord_trace() -> aiohttp.TraceConfig:
+    """A trace config for discord.py's HTTP client that records when commands first respond."""
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_end.append(_on_request_end)
+    return trace
+
+
+def record_command(interaction: discord.Interaction, status: str) -> None:
+    """Record a finished application command.
+
+    :param status: "ok" if the command completed, or "error" if it raised.
+    :type status: str"""
+
+    timing: CommandTiming | None = interaction.extras.get("timing")
+    command = interaction.command
+    if timing is None or command is None:
+        return
+
+    name = command.qualified_name
+    COMMANDS.inc(command=name, status=status)
+    COMMAND_SECONDS.observe(perf_counter() - timing.started_at, command=name)
+    if timing.first_response is not None:
+        FIRST_RESPONSE_SECONDS.observe(timing.first_response, command=name)
+    COMMAND_HTTP_SECONDS.observe(timing.http, command=name)
+    COMMAND_DB_SECONDS.observe(timing.db, command=name)
@@ -1,8 +1,28 @@
+from __future__ import annotations
+
+from functools import cache
+from typing import TYPE_CHECKING
+
 import discord
-import googletrans
 
-translator = googletrans.Translator()
-lang_dict = googletrans.LANGUAGES
+if TYPE_CHECKING:
+    import googletrans
+
+
+# googletrans and its dependencies are slow to import, so it's only imported when first used
+@cache
+def get_translator() -> googletrans.Translator:
+    import googletrans
+
+    return googletrans.Translator()
+
+
+def get_languages() -> dict[str, str]:
+    """Get googletrans' language codes and names."""
+
+    from googletrans import LANGUAGES
+
+    return LANGUAGES
 
 
 class Embed(discord.Embed):
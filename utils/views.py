@@ -79,6 +79,21 @@ class InfoButtons(discord.ui.View):
             )
 
 
+def live_views(client: discord.Client) -> set[discord.ui.View]:
+    """Get the views that are listening for interactions.
+
+    Views are found through the items registered in the client's view store, which covers
+    both views on sent messages and persistent views."""
+
+    store = client._connection._view_store
+    views = set(store._synced_message_views.values())
+    for items in store._views.values():
+        views.update(
+            item.view for item in items.values() if getattr(item, "view", None)
+        )
+    return views
+
+
 def get_emoji(key: str) -> str | None:
     """Get the emoji string for a key from the config file.
 